@@ -1,11 +1,9 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Callable, Dict, Any
+from typing import Callable, Dict, Any, NamedTuple
 from model import GameState
 
 
-@dataclass(frozen=True)
-class Command:
+class Command(NamedTuple):
     name: str
     payload: Dict[str, Any]
 
@@ -14,16 +12,18 @@ class CommandBus:
     def __init__(self, state: GameState):
         self.state = state
         self.handlers: Dict[str, Callable[[Command], None]] = {}
+        # bound once; handlers is only ever mutated in place
+        self._lookup = self.handlers.get
 
     def register(self, name: str, fn: Callable[[Command], None]) -> None:
         self.handlers[name] = fn
 
     def dispatch(self, cmd: Command) -> None:
-        handler = self.handlers.get(cmd.name)
-        if not handler:
-            self.state.log(f"Unknown command: {cmd.name}")
-            return
-        handler(cmd)
+        (self._lookup(cmd.name) or self._miss)(cmd)
+        self.state.dirty = True
+
+    def _miss(self, cmd: Command) -> None:
+        self.state.log("Unknown command: %s", cmd.name)
 
 
 def install_default_handlers(bus: CommandBus) -> None:
@@ -46,7 +46,7 @@ def install_default_handlers(bus: CommandBus) -> None:
         s.selected_unit_id = unit_id
         if unit_id:
             u = s.get_unit(unit_id)
-            s.log(f"Selected: {u.name if u else unit_id}")
+            s.log("Selected: %s", u.name if u else unit_id)
         else:
             s.log("Selection cleared.")
 
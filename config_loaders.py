@@ -1,14 +1,13 @@
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
-from typing import Dict, Optional, Tuple, Any
+import sys
+from typing import Dict, NamedTuple, Optional, Tuple
 
-from model import GameState, ProcessingUnit, Recipe
+from model import GameState, ProcessingUnit, Recipe, Status
+from json_io import load_json
 
 
-@dataclass(frozen=True)
-class ResourceDef:
+class ResourceDef(NamedTuple):
     id: str
     name: str
     weight: float
@@ -29,17 +28,24 @@ class ResourceCatalog:
     def ids(self):
         return self._resources.keys()
 
+    def __setstate__(self, state: dict) -> None:
+        # re-intern ids after unpickling (see Recipe.__setstate__)
+        self._resources = {sys.intern(k): r._replace(id=sys.intern(r.id))
+                           for k, r in state["_resources"].items()}
 
-def _load_json(path: str) -> Any:
-    with open(path, "r", encoding="utf-8") as f:
-        return json.load(f)
+
+def _require_resource(res_id: str, known: Dict[str, ResourceDef], context: str) -> str:
+    if res_id not in known:
+        raise ValueError(f"{context}: {res_id}")
+    return sys.intern(res_id)
 
 
 def load_resources(path: str) -> ResourceCatalog:
-    data = _load_json(path)
+    data = load_json(path)
     resources = {}
     for r in data.get("resources", []):
-        rid = r["id"]
+        # resource ids key every inventory/recipe dict; interned keys compare by identity
+        rid = sys.intern(r["id"])
         resources[rid] = ResourceDef(
             id=rid,
             name=r.get("name", rid),
@@ -51,28 +57,26 @@ def load_resources(path: str) -> ResourceCatalog:
 
 
 def load_recipes(path: str, catalog: ResourceCatalog) -> Dict[str, Recipe]:
-    data = _load_json(path)
+    data = load_json(path)
     out: Dict[str, Recipe] = {}
+    known = catalog._resources
 
     for r in data.get("recipes", []):
         rid = r["id"]
         mode = r.get("mode")  # "transfer" or None
 
-        inputs = dict(r.get("inputs", {}))
-        outputs = dict(r.get("outputs", {}))
-
-        # Validate referenced resource ids exist
-        for res_id in inputs.keys():
-            if catalog.get(res_id) is None:
-                raise ValueError(f"Recipe {rid} references unknown input resource id: {res_id}")
-        for res_id in outputs.keys():
-            if catalog.get(res_id) is None:
-                raise ValueError(f"Recipe {rid} references unknown output resource id: {res_id}")
+        # Copy while validating referenced resource ids exist
+        ctx = f"Recipe {rid} references unknown input resource id"
+        inputs = {_require_resource(k, known, ctx): v for k, v in r.get("inputs", {}).items()}
+        ctx = f"Recipe {rid} references unknown output resource id"
+        outputs = {_require_resource(k, known, ctx): v for k, v in r.get("outputs", {}).items()}
 
         # Transfer recipe can optionally specify a resource id
         transfer_res = r.get("transfer_resource", None)
-        if transfer_res is not None and transfer_res != "" and catalog.get(transfer_res) is None:
+        if transfer_res is not None and transfer_res != "" and transfer_res not in known:
             raise ValueError(f"Recipe {rid} references unknown transfer_resource id: {transfer_res}")
+        if transfer_res:
+            transfer_res = sys.intern(transfer_res)
 
         out[rid] = Recipe(
             id=rid,
@@ -91,8 +95,10 @@ def load_recipes(path: str, catalog: ResourceCatalog) -> Dict[str, Recipe]:
 
 
 def load_units(path: str, recipes: Dict[str, Recipe], catalog: ResourceCatalog) -> GameState:
-    data = _load_json(path)
+    data = load_json(path)
     s = GameState()
+    known = catalog._resources
+    units_by_id = s.units
     units = data.get("units", [])
     if not units:
         raise ValueError("units.json contained no units")
@@ -100,24 +106,29 @@ def load_units(path: str, recipes: Dict[str, Recipe], catalog: ResourceCatalog)
     # First pass: create units
     for u in units:
         uid = u["id"]
-        inv = dict(u.get("inventory", {}))
-
-        # Validate resource ids used in inventory
-        for res_id in inv.keys():
-            if catalog.get(res_id) is None:
-                raise ValueError(f"Unit {uid} inventory references unknown resource id: {res_id}")
+        # Copy while validating resource ids used in inventory
+        ctx = f"Unit {uid} inventory references unknown resource id"
+        inv = {_require_resource(k, known, ctx): v for k, v in u.get("inventory", {}).items()}
 
         recipe_obj = None
         recipe_id = u.get("recipe_id", None)
         if recipe_id:
-            if recipe_id not in recipes:
+            recipe_obj = recipes.get(recipe_id)
+            if recipe_obj is None:
                 raise ValueError(f"Unit {uid} references unknown recipe_id: {recipe_id}")
-            recipe_obj = recipes[recipe_id]
 
         pos_raw = u.get("pos", [0, 0])
         pos: Tuple[float, float] = (float(pos_raw[0]), float(pos_raw[1]))
 
-        s.units[uid] = ProcessingUnit(
+        raw_status = u.get("status", "Running")
+        try:
+            status = Status.parse(raw_status)
+        except ValueError:
+            # unrecognized labels have always meant "not running"; keep loading
+            status = Status.PAUSED
+            s.log("Unit %s: unknown status %r, treating it as Paused.", uid, raw_status)
+
+        s.add_unit(ProcessingUnit(
             id=uid,
             name=u.get("name", uid),
             kind=u.get("kind", "Unit"),
@@ -126,15 +137,15 @@ def load_units(path: str, recipes: Dict[str, Recipe], catalog: ResourceCatalog)
             output_id=u.get("output_id", None),
             inventory=inv,
             recipe=recipe_obj,
-            status=u.get("status", "Running"),
+            status=status,
             notes=u.get("notes", ""),
-        )
+        ))
 
     # Second pass: validate links point to existing units
-    for uid, unit in s.units.items():
-        if unit.input_id and unit.input_id not in s.units:
+    for uid, unit in units_by_id.items():
+        if unit.input_id and unit.input_id not in units_by_id:
             raise ValueError(f"Unit {uid} has input_id={unit.input_id} which does not exist")
-        if unit.output_id and unit.output_id not in s.units:
+        if unit.output_id and unit.output_id not in units_by_id:
             raise ValueError(f"Unit {uid} has output_id={unit.output_id} which does not exist")
 
     s.selected_unit_id = data.get("selected_unit_id", None)
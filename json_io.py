@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import json
+import os
+from typing import Any
+
+# orjson is optional: it parses/serializes several times faster than the
+# stdlib, but everything works without it.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def load_json(path: str) -> Any:
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dump_json(path: str, payload: Any) -> None:
+    # write a sibling temp file and swap it in, so a crash mid-write never truncates `path`
+    tmp_path = path + ".tmp"
+    if orjson is not None:
+        with open(tmp_path, "wb") as f:
+            f.write(orjson.dumps(payload, option=orjson.OPT_INDENT_2))
+    else:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
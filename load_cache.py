@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+import pickle
+from typing import Any, Callable, Sequence
+
+# Bump whenever a cached class changes layout or a loader changes what it builds,
+# so sidecars written by older code are ignored.
+CACHE_SCHEMA_VERSION = 16
+
+# source of the cached classes and their loaders; editing any of them invalidates
+# every sidecar without relying on a manual CACHE_SCHEMA_VERSION bump
+_HERE = os.path.dirname(os.path.abspath(__file__))
+CODE_DEPS = tuple(os.path.join(_HERE, name)
+                  for name in ("model.py", "map_loader.py", "config_loaders.py", "load_cache.py"))
+
+
+def _fingerprint(paths: Sequence[str]) -> tuple:
+    out = []
+    for p in paths:
+        st = os.stat(p)
+        out.append((p, st.st_mtime_ns, st.st_size))
+    return tuple(out)
+
+
+def cached_load(path: str, loader: Callable[..., Any], *args: Any, deps: Sequence[str] = ()) -> Any:
+    """
+    Returns loader(path, *args), memoized in a "<path>.pkl" sidecar.
+
+    The sidecar is used only while `path`, every file in `deps` (the sources
+    the extra args were built from) and the loader code in CODE_DEPS are
+    unchanged and the schema version matches.
+    Anything else, including an unreadable cache, falls back to the real loader.
+    """
+    cache_path = path + ".pkl"
+    key = (CACHE_SCHEMA_VERSION, loader.__module__, loader.__qualname__, _fingerprint([path, *deps, *CODE_DEPS]))
+
+    try:
+        with open(cache_path, "rb") as f:
+            cached_key, value = pickle.load(f)
+        if cached_key == key:
+            return value
+    except Exception:
+        pass  # missing, corrupt, or written by incompatible code: rebuild it
+
+    value = loader(path, *args)
+
+    try:
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump((key, value), f, protocol=5)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # read-only data dir: run uncached
+
+    return value
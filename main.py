@@ -9,10 +9,29 @@ from commands import Command, CommandBus, install_default_handlers
 from ui import UI, Layout
 
 from config_loaders import load_resources, load_recipes, load_units
+from load_cache import cached_load
 from tasks_loader import load_tasks, install_tasks_into_state
 from project_manager import ProjectManager, install_project_manager_handlers
 from map_loader import load_map_state
 
+# input events handled per frame; anything beyond this waits for the next frame
+MAX_EVENTS_PER_FRAME = 32
+
+# event types nothing here consumes; blocked at the SDL queue so they are never
+# boxed into Python events. Keyboard, text input and window events stay allowed:
+# pygame_gui needs them for text entries, key repeat and focus handling.
+UNUSED_EVENT_TYPES = [
+    pygame.JOYAXISMOTION, pygame.JOYBALLMOTION, pygame.JOYHATMOTION,
+    pygame.JOYBUTTONDOWN, pygame.JOYBUTTONUP, pygame.JOYDEVICEADDED, pygame.JOYDEVICEREMOVED,
+    pygame.CONTROLLERAXISMOTION, pygame.CONTROLLERBUTTONDOWN, pygame.CONTROLLERBUTTONUP,
+    pygame.CONTROLLERDEVICEADDED, pygame.CONTROLLERDEVICEREMOVED, pygame.CONTROLLERDEVICEREMAPPED,
+    pygame.CONTROLLERTOUCHPADDOWN, pygame.CONTROLLERTOUCHPADMOTION, pygame.CONTROLLERTOUCHPADUP,
+    pygame.CONTROLLERSENSORUPDATE,
+    pygame.FINGERDOWN, pygame.FINGERUP, pygame.FINGERMOTION, pygame.MULTIGESTURE,
+    pygame.AUDIODEVICEADDED, pygame.AUDIODEVICEREMOVED,
+    pygame.DROPFILE, pygame.DROPTEXT, pygame.DROPBEGIN, pygame.DROPCOMPLETE,
+]
+
 
 def main() -> int:
     # ------------------------------------------------------------
@@ -23,6 +42,7 @@ def main() -> int:
     layout = Layout(screen_size=(1280, 720))
     screen = pygame.display.set_mode(layout.screen_size)
     pygame.display.set_caption("Aetherfall — Logistics Console")
+    pygame.event.set_blocked(UNUSED_EVENT_TYPES)
 
     map_state = load_map_state(
         map_def_path="data/maps/argonaut_surface.json",
@@ -37,8 +57,11 @@ def main() -> int:
     # load configuration (JSON-driven)
     # ------------------------------------------------------------
     try:
-        resources = load_resources("data/resources.json")
-        recipes = load_recipes("data/recipes.json", resources)
+        # parsed + validated definitions are cached next to the JSON (see load_cache);
+        # the mutable GameState is built fresh every launch
+        resources = cached_load("data/resources.json", load_resources)
+        recipes = cached_load("data/recipes.json", load_recipes, resources,
+                              deps=["data/resources.json"])
         state = load_units("data/units.json", recipes, resources)
 
         projects = load_tasks("data/tasks.json")
@@ -73,7 +96,8 @@ def main() -> int:
         state=state,
         bus=bus,
         resources=resources, 
-        map_state=map_state
+        map_state=map_state,
+        ui_state_path="data/saves/ui_state.json"
     )
 
     # ------------------------------------------------------------
@@ -93,12 +117,24 @@ def main() -> int:
         dt_s = clock.tick(60) / 1000.0
         turn_accum += dt_s
 
-        for event in pygame.event.get():
+        events = pygame.event.get()
+        if len(events) > MAX_EVENTS_PER_FRAME:
+            # bounded work per frame; re-queue the overflow rather than drop it
+            # (a lost MOUSEBUTTONUP would leave the map stuck panning)
+            for event in events[MAX_EVENTS_PER_FRAME:]:
+                pygame.event.post(event)
+            events = events[:MAX_EVENTS_PER_FRAME]
+
+        hotkeys_seen = set()  # key-repeat storms fire each hotkey at most once per frame
+
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
                 break
 
-            if event.type == pygame.KEYDOWN:
+            if event.type == pygame.KEYDOWN and event.key not in hotkeys_seen:
+                hotkeys_seen.add(event.key)
+
                 if event.key == pygame.K_ESCAPE:
                     running = False
                     break
@@ -125,19 +161,25 @@ def main() -> int:
                     state.log("Saved exploration to slot.")                
 
             ui.process_event(event)
+            # any input may change hover/pan/selection visuals
+            state.dirty = True
 
         # run turn-based sim
         while turn_accum >= turn_dt:
             sim.tick_turn()
             turn_accum -= turn_dt
 
-        # draw
-        screen.fill((0, 0, 0))
-        ui.draw_map()
         ui.update(dt_s)
-        manager.draw_ui(screen)
-        pygame.display.flip()
 
+        # draw only when something changed (idle/paused frames just tick the clock)
+        if state.dirty:
+            screen.fill((0, 0, 0))
+            ui.draw_map()
+            manager.draw_ui(screen)
+            ui.present()
+            state.dirty = False
+
+    ui.save_ui_state()
     pygame.quit()
     return 0
 
@@ -1,55 +1,70 @@
 from __future__ import annotations
 
-import json
+import base64
 import os
 from dataclasses import dataclass
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, NamedTuple, Tuple, Optional, Any
+
+import numpy as np
+
+from json_io import load_json, dump_json
+from load_cache import cached_load
+
+# numba is optional; without it the numpy paths below are used for every size
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 
 # ----------------------------
 # RLE helpers
 # ----------------------------
 
-def rle_decode(pairs: List[List[int]], expected_len: int) -> List[int]:
-    out: List[int] = []
-    for pair in pairs:
-        if not isinstance(pair, list) or len(pair) != 2:
-            raise ValueError(f"Invalid RLE pair: {pair}")
-        value, count = int(pair[0]), int(pair[1])
-        if count < 0:
-            raise ValueError(f"Invalid RLE count: {count}")
-        out.extend([value] * count)
-        if len(out) > expected_len:
-            raise ValueError("RLE decode exceeded expected length")
-    if len(out) != expected_len:
-        raise ValueError(f"RLE decode length mismatch: got {len(out)} expected {expected_len}")
-    return out
-
-
-def rle_encode(values: List[int]) -> List[List[int]]:
-    if not values:
-        return []
-    pairs: List[List[int]] = []
-    cur = int(values[0])
-    run = 1
-    for v in values[1:]:
-        v = int(v)
-        if v == cur:
-            run += 1
-        else:
-            pairs.append([cur, run])
-            cur = v
-            run = 1
-    pairs.append([cur, run])
-    return pairs
+# below this many tiles the numpy path wins (no JIT dispatch overhead)
+NUMBA_MIN_TILES = 100_000
+
+if njit is not None:
+    @njit(cache=True)
+    def _rle_decode_nb(vals, counts, total):
+        out = np.empty(total, dtype=np.int64)
+        pos = 0
+        for i in range(vals.shape[0]):
+            v = vals[i]
+            for _ in range(counts[i]):
+                out[pos] = v
+                pos += 1
+        return out
+else:
+    _rle_decode_nb = None
+
+
+def rle_decode(pairs: List[List[int]], expected_len: int) -> np.ndarray:
+    if len(pairs) == 0:
+        arr = np.empty((0, 2), dtype=np.int64)
+    else:
+        try:
+            arr = np.asarray(pairs, dtype=np.int64)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Invalid RLE pairs: {e}") from e
+    if arr.ndim != 2 or arr.shape[1] != 2:
+        raise ValueError(f"Invalid RLE pairs shape: {arr.shape}")
+    values, counts = arr[:, 0], arr[:, 1]
+    if (counts < 0).any():
+        raise ValueError(f"Invalid RLE count: {int(counts.min())}")
+    total = int(counts.sum())
+    if total != expected_len:
+        raise ValueError(f"RLE decode length mismatch: got {total} expected {expected_len}")
+    if _rle_decode_nb is not None and total >= NUMBA_MIN_TILES:
+        return _rle_decode_nb(np.ascontiguousarray(values), np.ascontiguousarray(counts), total)
+    return np.repeat(values, counts)
 
 
 # ----------------------------
 # Map definition + save slot
 # ----------------------------
 
-@dataclass(frozen=True)
-class TerrainType:
+class TerrainType(NamedTuple):
     id: int
     name: str
     passable: bool
@@ -68,7 +83,11 @@ class MapDef:
     tile_world_size: int
 
     terrain_palette: Dict[int, TerrainType]
-    tiles: List[int]  # length = width*height, each is terrain id
+    tiles: np.ndarray  # shape (height, width), each is terrain id
+
+    # terrain-id indexed lookup tables, e.g. cost_lut[tiles] is the whole map's cost grid
+    cost_lut: np.ndarray      # float32
+    passable_lut: np.ndarray  # bool
 
     @property
     def tile_count(self) -> int:
@@ -78,11 +97,35 @@ class MapDef:
     def world_size(self) -> Tuple[int, int]:
         return (self.width * self.tile_world_size, self.height * self.tile_world_size)
 
+    def tile_at(self, tx: int, ty: int) -> int:
+        return int(self.tiles[ty, tx])
+
 
 @dataclass
 class SaveSlot:
     map_id: str
-    explored: List[int]  # 0 hidden, 1 visible (len = tile_count)
+    tile_count: int
+    # bit-packed exploration: tile idx is visible when bit (idx & 7) of byte (idx >> 3) is set
+    explored_bits: np.ndarray
+
+    @classmethod
+    def hidden(cls, map_id: str, tile_count: int) -> "SaveSlot":
+        return cls(map_id=map_id, tile_count=tile_count,
+                   explored_bits=np.zeros((tile_count + 7) // 8, dtype=np.uint8))
+
+    @classmethod
+    def from_flags(cls, map_id: str, flags: np.ndarray) -> "SaveSlot":
+        bits = np.packbits(np.asarray(flags, dtype=np.uint8), bitorder="little")
+        return cls(map_id=map_id, tile_count=int(len(flags)), explored_bits=bits)
+
+    def explored_flags(self) -> np.ndarray:
+        """Unpacked 0/1 uint8 array of length tile_count."""
+        return np.unpackbits(self.explored_bits, count=self.tile_count, bitorder="little")
+
+
+# fog mask colors, multiplied onto the map: explored tiles keep their color, hidden go black
+FOG_CLEAR = (255, 255, 255)
+FOG_HIDDEN = (0, 0, 0)
 
 
 @dataclass
@@ -93,34 +136,71 @@ class MapState:
 
     # bitmap loaded later (pygame surface) to avoid importing pygame here
     map_image = None  # pygame.Surface
+    _fog_surface = None  # pygame.Surface, built lazily by build_fog_surface()
+
+    def __post_init__(self) -> None:
+        # hot-path locals for per-tile access; explored_bits is only ever mutated in place
+        self._w = self.map_def.width
+        self._h = self.map_def.height
+        self._buf = self.save.explored_bits
+
+        self._save_dir = os.path.dirname(self.save_slot_path)
+        self._save_dir_ready = False
 
     def is_explored(self, tx: int, ty: int) -> bool:
-        if tx < 0 or ty < 0 or tx >= self.map_def.width or ty >= self.map_def.height:
+        if not (0 <= tx < self._w and 0 <= ty < self._h):
             return False
-        idx = ty * self.map_def.width + tx
-        return self.save.explored[idx] == 1
+        idx = ty * self._w + tx
+        return bool(self._buf[idx >> 3] & (1 << (idx & 7)))
 
     def set_explored(self, tx: int, ty: int, val: int) -> None:
-        if tx < 0 or ty < 0 or tx >= self.map_def.width or ty >= self.map_def.height:
+        if not (0 <= tx < self._w and 0 <= ty < self._h):
             return
-        idx = ty * self.map_def.width + tx
-        self.save.explored[idx] = 1 if val else 0
+        idx = ty * self._w + tx
+        mask = 1 << (idx & 7)
+        if val:
+            self._buf[idx >> 3] |= mask
+        else:
+            self._buf[idx >> 3] &= 0xFF ^ mask
+        # patch the one fog pixel rather than rebuilding the whole mask
+        if self._fog_surface is not None:
+            self._fog_surface.set_at((tx, ty), FOG_CLEAR if val else FOG_HIDDEN)
 
     def reveal_all(self) -> None:
-        for i in range(len(self.save.explored)):
-            self.save.explored[i] = 1
+        self._buf.fill(0xFF)
+        if self._fog_surface is not None:
+            self._fog_surface.fill(FOG_CLEAR)
 
     def hide_all(self) -> None:
-        for i in range(len(self.save.explored)):
-            self.save.explored[i] = 0
+        self._buf.fill(0)
+        if self._fog_surface is not None:
+            self._fog_surface.fill(FOG_HIDDEN)
+
+    def build_fog_surface(self):
+        """
+        One pixel per tile: FOG_CLEAR where explored, FOG_HIDDEN where hidden.
+        Meant to be scaled up and blitted with BLEND_MULT. Built once, then kept in
+        sync by set_explored/reveal_all/hide_all.
+        """
+        if self._fog_surface is None:
+            import pygame
+            m = self.map_def
+            flags = self.save.explored_flags().reshape(m.height, m.width) * 255
+            # surfarray is indexed [x, y]
+            rgb = np.repeat(flags.T[:, :, None], 3, axis=2)
+            self._fog_surface = pygame.surfarray.make_surface(rgb)
+        return self._fog_surface
 
     def save_to_disk(self) -> None:
-        save_save_slot(self.save_slot_path, self.map_def, self.save)
+        if not self._save_dir_ready:
+            if self._save_dir:
+                os.makedirs(self._save_dir, exist_ok=True)
+            self._save_dir_ready = True
+        save_save_slot(self.save_slot_path, self.map_def, self.save, make_dirs=False)
 
 
 def load_map_def(path: str) -> MapDef:
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = load_json(path)
 
     grid = data["grid"]
     width = int(grid["width"])
@@ -131,6 +211,8 @@ def load_map_def(path: str) -> MapDef:
     palette: Dict[int, TerrainType] = {}
     for k, v in palette_raw.items():
         tid = int(k)
+        if tid < 0:
+            raise ValueError(f"Negative terrain id in palette: {tid}")
         palette[tid] = TerrainType(
             id=tid,
             name=str(v.get("name", f"Terrain{tid}")),
@@ -148,10 +230,23 @@ def load_map_def(path: str) -> MapDef:
         raw = tiles_block.get("data", [])
         if len(raw) != expected_len:
             raise ValueError("raw_flat tiles length mismatch")
-        tiles = [int(x) for x in raw]
+        tiles = np.asarray(raw, dtype=np.int64)
     else:
         raise ValueError(f"Unsupported tiles encoding: {enc}")
 
+    if tiles.size and int(tiles.min()) < 0:
+        raise ValueError("tiles contain negative terrain ids")
+    max_id = max([int(tiles.max()) if tiles.size else 0, *palette.keys()])
+    tile_dtype = np.uint8 if max_id <= 0xFF else (np.uint16 if max_id <= 0xFFFF else np.uint32)
+    tiles = tiles.astype(tile_dtype).reshape(height, width)
+
+    # ids missing from the palette get the TerrainType defaults used above
+    cost_lut = np.ones(max_id + 1, dtype=np.float32)
+    passable_lut = np.ones(max_id + 1, dtype=bool)
+    for tid, t in palette.items():
+        cost_lut[tid] = t.cost
+        passable_lut[tid] = t.passable
+
     return MapDef(
         id=str(data["id"]),
         name=str(data.get("name", data["id"])),
@@ -162,55 +257,66 @@ def load_map_def(path: str) -> MapDef:
         tile_world_size=tile_world_size,
         terrain_palette=palette,
         tiles=tiles,
+        cost_lut=cost_lut,
+        passable_lut=passable_lut,
     )
 
 
 def load_save_slot(save_path: str, map_def: MapDef) -> SaveSlot:
     if not os.path.exists(save_path):
         # default: everything hidden
-        return SaveSlot(map_id=map_def.id, explored=[0] * map_def.tile_count)
+        return SaveSlot.hidden(map_def.id, map_def.tile_count)
 
-    with open(save_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = load_json(save_path)
 
     map_id = str(data.get("map_id", map_def.id))
     if map_id != map_def.id:
         # map changed; safest v1 behavior: reset exploration
-        return SaveSlot(map_id=map_def.id, explored=[0] * map_def.tile_count)
+        return SaveSlot.hidden(map_def.id, map_def.tile_count)
 
     exp_block = data.get("exploration", {"encoding": "rle", "data": [[0, map_def.tile_count]]})
     enc = exp_block.get("encoding", "rle")
 
-    if enc == "rle":
+    if enc == "b64_bits":
+        # packed bits, written by save_save_slot: no per-tile work at all
+        if int(exp_block.get("len", -1)) != map_def.tile_count:
+            raise ValueError("b64_bits exploration length mismatch")
+        bits = np.frombuffer(base64.b64decode(exp_block.get("bits", "")), dtype=np.uint8).copy()
+        if bits.size != (map_def.tile_count + 7) // 8:
+            raise ValueError("b64_bits exploration byte count mismatch")
+        return SaveSlot(map_id=map_def.id, tile_count=map_def.tile_count, explored_bits=bits)
+    elif enc == "rle":
         explored = rle_decode(exp_block.get("data", []), map_def.tile_count)
     elif enc == "raw_flat":
         raw = exp_block.get("data", [])
         if len(raw) != map_def.tile_count:
             raise ValueError("raw_flat exploration length mismatch")
-        explored = [int(x) for x in raw]
+        explored = np.asarray(raw, dtype=np.int64)
     else:
         raise ValueError(f"Unsupported exploration encoding: {enc}")
 
     # clamp to 0/1
-    explored = [1 if int(x) else 0 for x in explored]
-    return SaveSlot(map_id=map_def.id, explored=explored)
+    return SaveSlot.from_flags(map_def.id, explored != 0)
 
 
-def save_save_slot(save_path: str, map_def: MapDef, save: SaveSlot) -> None:
-    os.makedirs(os.path.dirname(save_path), exist_ok=True)
+def save_save_slot(save_path: str, map_def: MapDef, save: SaveSlot, make_dirs: bool = True) -> None:
+    save_dir = os.path.dirname(save_path)
+    if make_dirs and save_dir:
+        os.makedirs(save_dir, exist_ok=True)
     payload = {
-        "version": 1,
+        "version": 2,
         "map_id": map_def.id,
         "exploration": {
-            "encoding": "rle",
-            "data": rle_encode(save.explored),
+            # rle / raw_flat saves from older versions are still readable
+            "encoding": "b64_bits",
+            "len": save.tile_count,
+            "bits": base64.b64encode(save.explored_bits.tobytes()).decode("ascii"),
         },
     }
-    with open(save_path, "w", encoding="utf-8") as f:
-        json.dump(payload, f, indent=2)
+    dump_json(save_path, payload)
 
 
 def load_map_state(map_def_path: str, save_slot_path: str) -> MapState:
-    m = load_map_def(map_def_path)
+    m = cached_load(map_def_path, load_map_def)
     s = load_save_slot(save_slot_path, m)
     return MapState(map_def=m, save_slot_path=save_slot_path, save=s)
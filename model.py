@@ -1,8 +1,20 @@
 from __future__ import annotations
 
+from collections import Counter, deque
 from dataclasses import dataclass, field
-from typing import Dict, Optional, Tuple, List
+from enum import IntEnum
+from typing import Deque, Dict, Iterable, Optional, Tuple, List
 import time
+from itertools import islice
+import sys
+
+import numpy as np
+
+# numba is optional; without it the numpy gating path is used
+try:
+    from numba import njit
+except ImportError:
+    njit = None
 
 
 # ---------- Core game concepts ----------
@@ -10,7 +22,44 @@ import time
 Inventory = Dict[str, int]
 
 
-@dataclass
+class Status(IntEnum):
+    """ProcessingUnit status. RUNNING is 0 so `if u.status:` means "not running"."""
+    RUNNING = 0
+    STALLED = 1
+    PAUSED = 2
+
+    # display as "Running" etc. (IntEnum would otherwise print the number)
+    def __str__(self) -> str:
+        return self.name.capitalize()
+
+    def __format__(self, spec: str) -> str:
+        return format(str(self), spec)
+
+    @classmethod
+    def parse(cls, label: str) -> Status:
+        """'Running' / 'running' / 'RUNNING' -> Status.RUNNING; ValueError if unknown."""
+        if not isinstance(label, str):
+            raise ValueError(f"Unknown status: {label!r}")
+        try:
+            return cls[label.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown status: {label}") from None
+
+
+# event log: ring buffer size, and the last formatted stamp as [epoch second, "HH:MM:SS"]
+EVENT_LOG_MAX = 300
+_stamp_cache = [-1, ""]
+
+# values of GameState._status (the SoA schedule column)
+GATE_IDLE = 0     # not Running, or no recipe: never fires
+GATE_ACTIVE = 1   # Running with a recipe
+
+
+def _intern_inventory(inv: Inventory) -> Inventory:
+    return {sys.intern(k): v for k, v in inv.items()}
+
+
+@dataclass(frozen=True, slots=True)
 class Recipe:
     """
     Recipe definition for a ProcessingUnit.
@@ -24,6 +73,8 @@ class Recipe:
          - Consumes 'inputs' from the unit's own inventory
          - Produces 'outputs' into the unit's own inventory
          - Power can be checked later.
+
+    Frozen: one instance per recipe id is shared by every unit that runs it.
     """
     id: str
     name: str
@@ -31,15 +82,39 @@ class Recipe:
     duration_turns: int = 1
     power_required: int = 0
 
-    # craft mode fields
-    inputs: Dict[str, int] = field(default_factory=dict)   # resource_id -> qty
-    outputs: Dict[str, int] = field(default_factory=dict)  # resource_id -> qty
+    # craft mode fields (don't mutate after construction; hashing skips them)
+    inputs: Dict[str, int] = field(default_factory=dict, hash=False)   # resource_id -> qty
+    outputs: Dict[str, int] = field(default_factory=dict, hash=False)  # resource_id -> qty
 
     # transfer mode fields
     transfer_resource: Optional[str] = None  # resource_id or None
 
+    # craft-loop snapshots, derived from inputs/outputs in __post_init__
+    _input_items: Tuple[Tuple[str, int], ...] = field(default=(), init=False, repr=False, compare=False)
+    _output_items: Tuple[Tuple[str, int], ...] = field(default=(), init=False, repr=False, compare=False)
+    _produced_text: str = field(default="", init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        out_items = tuple(self.outputs.items())
+        object.__setattr__(self, "_input_items", tuple(self.inputs.items()))
+        object.__setattr__(self, "_output_items", out_items)
+        object.__setattr__(self, "_produced_text",
+                           ", ".join(f"{qty} {rid}" for rid, qty in out_items) or "(nothing)")
+
+    def __getstate__(self) -> tuple:
+        return (self.id, self.name, self.mode, self.duration_turns, self.power_required,
+                self.inputs, self.outputs, self.transfer_resource)
 
-@dataclass
+    def __setstate__(self, state: tuple) -> None:
+        # unpickled strings (load_cache) are fresh objects; re-intern the resource ids
+        # so they still match unit inventory keys by identity
+        rid, name, mode, duration, power, inputs, outputs, transfer = state
+        self.__init__(rid, name, mode, duration, power,
+                      _intern_inventory(inputs), _intern_inventory(outputs),
+                      sys.intern(transfer) if transfer else transfer)
+
+
+@dataclass(slots=True)
 class ProcessingUnit:
     id: str
     name: str
@@ -52,36 +127,52 @@ class ProcessingUnit:
     inventory: Inventory = field(default_factory=dict)
     recipe: Optional[Recipe] = None
 
-    status: str = "Running"  # Running / Stalled / Paused
+    status: Status = Status.RUNNING
     notes: str = ""
 
-    # internal progress for duration-based actions
-    _turn_progress: int = 0
-
     # optional future-friendly fields (safe to ignore for now)
     inventory_capacity: Optional[int] = None
     power_capacity: Optional[int] = None
 
+    # bumped whenever inventory changes, so views can skip rebuilding unchanged units
+    version: int = field(default=0, compare=False)
+
+    def __post_init__(self) -> None:
+        # inventories are keyed by resource ids shared across every unit and recipe;
+        # interning makes those dict lookups identity compares
+        self.inventory = _intern_inventory(self.inventory)
+
     def inv_get(self, item_id: str) -> int:
         return int(self.inventory.get(item_id, 0))
 
     def inv_add(self, item_id: str, qty: int) -> None:
-        if qty == 0:
+        if not qty:
             return
-        self.inventory[item_id] = self.inv_get(item_id) + qty
-        if self.inventory[item_id] <= 0:
-            self.inventory.pop(item_id, None)
+        inv = self.inventory
+        new = inv.get(item_id, 0) + qty
+        if new > 0:
+            inv[item_id] = new
+        else:
+            inv.pop(item_id, None)
+        self.version += 1
 
     def inv_remove(self, item_id: str, qty: int) -> bool:
-        if self.inv_get(item_id) < qty:
+        inv = self.inventory
+        have = inv.get(item_id, 0)
+        if have < qty:
             return False
-        self.inv_add(item_id, -qty)
+        left = have - qty
+        if left > 0:
+            inv[item_id] = left
+        else:
+            inv.pop(item_id, None)
+        self.version += 1
         return True
 
 
 # ---------- Project management ----------
 
-@dataclass
+@dataclass(slots=True)
 class Task:
     id: str
     name: str
@@ -89,46 +180,157 @@ class Task:
     completed: bool = False
 
 
-@dataclass
+@dataclass(slots=True)
 class Goal:
     id: str
     name: str
     required: bool = True
     tasks: List[Task] = field(default_factory=list)
     completed: bool = False  # derived
+    _req_incomplete: int = field(default=0, init=False, repr=False, compare=False)  # required tasks not yet completed
 
 
-@dataclass
+@dataclass(slots=True)
 class Project:
     id: str
     name: str
     required: bool = True
     goals: List[Goal] = field(default_factory=list)
     completed: bool = False  # derived
+    _req_goal_incomplete: int = field(default=0, init=False, repr=False, compare=False)  # required goals not yet completed
 
 
 # ---------- Game state ----------
 
-@dataclass
+@dataclass(slots=True)
 class GameState:
     # simulation graph
     units: Dict[str, ProcessingUnit] = field(default_factory=dict)
+    units_version: int = 0  # bumped by add_unit/remove_unit; lets views cache per-unit data
+    assets_version: int = 0  # bumped whenever the simulation changes any unit inventory
     selected_unit_id: Optional[str] = None
 
     # projects/goals/tasks
     projects: List[Project] = field(default_factory=list)
     selected_pm_item: Optional[str] = None  # e.g. "project:x" / "goal:x/y" / "task:x/y/z"
+    projects_version: int = 0  # bumped whenever project/goal/task state changes
+    # id lookups over `projects`, built by index_projects()
+    _project_index: Dict[str, Project] = field(default_factory=dict)
+    _goal_index: Dict[Tuple[str, str], Goal] = field(default_factory=dict)
+    _task_index: Dict[Tuple[str, str, str], Task] = field(default_factory=dict)
 
     # logs + time
-    events: List[str] = field(default_factory=list)
+    events: Deque[str] = field(default_factory=lambda: deque(maxlen=EVENT_LOG_MAX))
+    events_html: Deque[str] = field(default_factory=lambda: deque(maxlen=EVENT_LOG_MAX))  # events, HTML-escaped
+    events_version: int = 0  # bumped by log()
     paused: bool = False
     sim_turn: int = 0
 
-    def log(self, msg: str) -> None:
-        stamp = time.strftime("%H:%M:%S")
-        self.events.append(f"[{stamp}] {msg}")
-        if len(self.events) > 300:
-            self.events = self.events[-300:]
+    # set whenever something visible changes; the main loop redraws and clears it
+    dirty: bool = True
+
+    # Structure-of-arrays schedule, one row per unit in tick (sorted id) order.
+    # Built by rebuild_schedule(); _sorted_uids is None when it needs rebuilding.
+    #   _next_turn: sim_turn on which the unit next fires
+    #   _active:    rows that are GATE_ACTIVE; idle units are never looked at
+    _sorted_uids: Optional[List[str]] = None
+    _idx_by_uid: Dict[str, int] = field(default_factory=dict)
+    _next_turn: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    _duration: np.ndarray = field(default_factory=lambda: np.ones(0, dtype=np.int64))
+    _status: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.uint8))
+    _active: np.ndarray = field(default_factory=lambda: np.zeros(0, dtype=np.intp))
+
+    def log(self, msg: str, *args) -> None:
+        """printf-style: log("moved %d %s", qty, rid) formats only here, once."""
+        if args:
+            msg = msg % args
+        self.log_many((msg,))
+
+    def log_many(self, msgs: Iterable[str]) -> None:
+        """One event per message, sharing a stamp; each deque is extended once."""
+        # stamps have 1 s resolution: format once per second, not once per event
+        now = int(time.time())
+        if now != _stamp_cache[0]:
+            _stamp_cache[0] = now
+            _stamp_cache[1] = time.strftime("%H:%M:%S", time.localtime(now))
+        stamp = _stamp_cache[1]
+        lines = [f"[{stamp}] {msg}" for msg in msgs]
+        self.events.extend(lines)  # deque drops the oldest past EVENT_LOG_MAX
+        # escaped once here so the log view never re-escapes old lines
+        self.events_html.extend(line.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+                                for line in lines)
+        self.events_version += 1
+
+    def recent_events(self, n: int, html: bool = False) -> List[str]:
+        """Last n events (HTML-escaped if html), oldest first, without copying the whole ring buffer."""
+        out = list(islice(reversed(self.events_html if html else self.events), n))
+        out.reverse()
+        return out
+
+    def add_unit(self, unit: ProcessingUnit) -> None:
+        self.units[unit.id] = unit
+        self._sorted_uids = None
+        self.units_version += 1
+
+    def remove_unit(self, unit_id: str) -> None:
+        if self.units.pop(unit_id, None) is not None:
+            self._sorted_uids = None
+            self.units_version += 1
+
+    def rebuild_schedule(self) -> None:
+        """
+        Rebuild the schedule columns from self.units. Units that were already
+        scheduled keep their next firing turn.
+        """
+        old_idx = self._idx_by_uid
+        old_next, old_dur, old_status = self._next_turn, self._duration, self._status
+        uids = sorted(self.units)
+        n = len(uids)
+        self._next_turn = np.zeros(n, dtype=np.int64)
+        self._duration = np.ones(n, dtype=np.int64)
+        self._status = np.zeros(n, dtype=np.uint8)
+        self._idx_by_uid = {uid: i for i, uid in enumerate(uids)}
+        self._sorted_uids = uids
+        for i, uid in enumerate(uids):
+            j = old_idx.get(uid)
+            if j is not None:
+                self._next_turn[i] = old_next[j]
+                self._duration[i] = old_dur[j]
+                self._status[i] = old_status[j]
+            self._write_gate(i, self.units[uid])
+        self._active = np.flatnonzero(self._status == GATE_ACTIVE)
+
+    def set_unit_status(self, unit_id: str, status: Status) -> None:
+        self.units[unit_id].status = status
+        self.update_unit_schedule(unit_id)
+
+    def set_unit_recipe(self, unit_id: str, recipe: Optional[Recipe]) -> None:
+        u = self.units[unit_id]
+        u.recipe = recipe
+        u.version += 1
+        self.update_unit_schedule(unit_id)
+
+    def update_unit_schedule(self, unit_id: str) -> None:
+        """
+        Call after changing a unit's status or recipe directly (set_unit_status /
+        set_unit_recipe do it for you). Without it a stopped unit is still skipped by
+        tick_turn, but a unit that starts running is not picked up until the next rebuild.
+        """
+        if self._sorted_uids is None:
+            return  # next tick rebuilds everything anyway
+        i = self._idx_by_uid.get(unit_id)
+        if i is not None:
+            self._write_gate(i, self.units[unit_id])
+            self._active = np.flatnonzero(self._status == GATE_ACTIVE)
+
+    def _write_gate(self, i: int, u: ProcessingUnit) -> None:
+        dur = max(1, int(u.recipe.duration_turns)) if u.recipe else 1
+        active = bool(u.recipe) and u.status == Status.RUNNING
+        if active and (self._status[i] != GATE_ACTIVE or self._duration[i] != dur):
+            # (re)starting: first firing is a full duration from now
+            self._next_turn[i] = self.sim_turn + dur
+        self._duration[i] = dur
+        self._status[i] = GATE_ACTIVE if active else GATE_IDLE
 
     def get_unit(self, unit_id: Optional[str]) -> Optional[ProcessingUnit]:
         if not unit_id:
@@ -138,6 +340,14 @@ class GameState:
     def get_selected_unit(self) -> Optional[ProcessingUnit]:
         return self.get_unit(self.selected_unit_id)
 
+    def index_projects(self) -> None:
+        """Rebuild the project/goal/task id indexes; call after replacing `projects`."""
+        self._project_index = {p.id: p for p in self.projects}
+        self._goal_index = {(p.id, g.id): g for p in self.projects for g in p.goals}
+        self._task_index = {(p.id, g.id, t.id): t
+                            for p in self.projects for g in p.goals for t in g.tasks}
+        self.projects_version += 1
+
     def recompute_project_status(self) -> None:
         """
         Goal is complete when all REQUIRED tasks are completed.
@@ -145,62 +355,116 @@ class GameState:
         Optional goals/tasks do not block completion.
         """
         for p in self.projects:
+            p._req_goal_incomplete = 0
             for g in p.goals:
-                req_tasks = [t for t in g.tasks if t.required]
-                g.completed = (len(req_tasks) == 0) or all(t.completed for t in req_tasks)
-
-            req_goals = [g for g in p.goals if g.required]
-            p.completed = (len(req_goals) == 0) or all(g.completed for g in req_goals)
+                g._req_incomplete = sum(1 for t in g.tasks if t.required and not t.completed)
+                g.completed = g._req_incomplete == 0
+                if g.required and not g.completed:
+                    p._req_goal_incomplete += 1
+            p.completed = p._req_goal_incomplete == 0
+        self.projects_version += 1
+
+    def apply_task_toggle(self, project: Project, goal: Goal, task: Task) -> None:
+        """
+        Incremental form of recompute_project_status() for a single task whose
+        `completed` flag just flipped. Relies on the counters that method set up.
+        """
+        self.projects_version += 1  # the task line itself changed
+        if not task.required:
+            return
+        goal._req_incomplete += -1 if task.completed else 1
+        was_completed = goal.completed
+        goal.completed = goal._req_incomplete == 0
+        if goal.required and goal.completed != was_completed:
+            project._req_goal_incomplete += -1 if goal.completed else 1
+            project.completed = project._req_goal_incomplete == 0
 
     def all_inventories_summary(self) -> Dict[str, int]:
         """
         Global resource counts across all units (by resource id).
         Useful for "Assets (Global)" views.
         """
-        total: Dict[str, int] = {}
+        total: Counter = Counter()
         for u in self.units.values():
-            for rid, qty in u.inventory.items():
-                total[rid] = total.get(rid, 0) + int(qty)
-        return total
+            total.update(u.inventory)
+        return dict(total)
 
 
 # ---------- Simulation ----------
 
+def _due_units_np(next_turn: np.ndarray, duration: np.ndarray, active: np.ndarray, turn: int) -> np.ndarray:
+    """
+    Rows (ascending) among `active` that fire on `turn`; their next_turn is pushed
+    one duration ahead. Nothing is written for units that aren't due.
+    """
+    due = active[next_turn[active] <= turn]
+    next_turn[due] = turn + duration[due]
+    return due
+
+
+if njit is not None:
+    # same contract as _due_units_np, as one native pass; keep the column
+    # dtypes fixed (int64/int64/intp) so this stays in nopython mode
+    @njit(cache=True, nogil=True)
+    def _due_units(next_turn, duration, active, turn):
+        out = np.empty(active.shape[0], dtype=np.intp)
+        k = 0
+        for j in range(active.shape[0]):
+            i = active[j]
+            if next_turn[i] <= turn:
+                next_turn[i] = turn + duration[i]
+                out[k] = i
+                k += 1
+        return out[:k]
+else:
+    _due_units = _due_units_np
+
+
 class Simulation:
     """
     Turn-based simulation.
     Each tick_turn() increments sim_turn and processes each unit once.
+    What the units did is logged as one event per turn.
     """
     def __init__(self, state: GameState):
         self.state = state
+        self._turn_events: List[str] = []  # this turn's unit actions, flushed by tick_turn
+        self._inventory_changed = False  # set by _process_* when they move items; read by tick_turn
 
     def tick_turn(self) -> None:
         s = self.state
         if s.paused:
             return
 
-        s.sim_turn += 1
+        if s._sorted_uids is None:
+            s.rebuild_schedule()
 
-        # stable iteration order for debuggability
-        for uid in sorted(s.units.keys()):
-            u = s.units[uid]
-            if u.status != "Running":
-                continue
-            if not u.recipe:
-                continue
-
-            # duration gating
-            u._turn_progress += 1
-            dur = max(1, int(u.recipe.duration_turns))
-            if u._turn_progress < dur:
+        s.sim_turn += 1
+        s.dirty = True
+
+        # only active units that are due this turn pay any per-unit Python cost
+        due = _due_units(s._next_turn, s._duration, s._active, s.sim_turn)
+
+        # stable iteration order for debuggability (rows are in sorted id order)
+        uids = s._sorted_uids
+        get = s.units.__getitem__
+        for i in due:
+            u = get(uids[i])
+            # the schedule may predate a direct status/recipe change; re-check like the loop always did
+            if not u.recipe or u.status != Status.RUNNING:
                 continue
-            u._turn_progress = 0
-
             if u.recipe.mode == "transfer":
                 self._process_transfer(u)
             else:
                 self._process_craft(u)
 
+        if self._inventory_changed:
+            s.assets_version += 1
+            self._inventory_changed = False
+        if self._turn_events:
+            s.log_many(self._turn_events)
+            self._turn_events.clear()
+
     # ----- internals -----
 
     def _choose_transfer_item(self, source: ProcessingUnit, preferred: Optional[str]) -> Optional[str]:
@@ -231,7 +495,8 @@ class Simulation:
 
             if u.inv_remove(item, 1):
                 dst.inv_add(item, 1)
-                s.log(f"{u.name}: output 1 {item} -> {dst.name}")
+                self._inventory_changed = True
+                self._turn_events.append(f"{u.name}: output 1 {item} -> {dst.name}")
             return
 
         # Transfer units: require input and output
@@ -246,31 +511,46 @@ class Simulation:
 
         if src.inv_remove(item, 1):
             dst.inv_add(item, 1)
-            s.log(f"{u.name}: moved 1 {item} from {src.name} -> {dst.name}")
+            self._inventory_changed = True
+            self._turn_events.append(f"{u.name}: moved 1 {item} from {src.name} -> {dst.name}")
 
     def _process_craft(self, u: ProcessingUnit) -> None:
         """
         Crafting consumes inputs and produces outputs in the unit's own inventory.
         (Later: power checks, input links, output links, queues, etc.)
         """
-        s = self.state
         r = u.recipe
         if not r:
             return
 
-        # verify inputs exist
-        for rid, qty in r.inputs.items():
-            if u.inv_get(rid) < qty:
+        inv = u.inventory
+        get = inv.get
+
+        # verify inputs exist (separate pass so a short craft changes nothing)
+        for rid, qty in r._input_items:
+            if get(rid, 0) < qty:
                 return
 
-        # consume
-        for rid, qty in r.inputs.items():
-            u.inv_remove(rid, qty)
+        # consume (same bookkeeping as inv_remove, checks already done)
+        for rid, qty in r._input_items:
+            left = get(rid, 0) - qty
+            if left > 0:
+                inv[rid] = left
+            else:
+                inv.pop(rid, None)
+
+        # produce (same bookkeeping as inv_add)
+        for rid, qty in r._output_items:
+            if not qty:
+                continue
+            new = get(rid, 0) + qty
+            if new > 0:
+                inv[rid] = new
+            else:
+                inv.pop(rid, None)
 
-        # produce
-        for rid, qty in r.outputs.items():
-            u.inv_add(rid, qty)
+        u.version += 1
+        self._inventory_changed = True
 
         # optional: auto-push outputs to output_id later; for now leave in local inventory
-        produced = ", ".join([f"{qty} {rid}" for rid, qty in r.outputs.items()]) if r.outputs else "(nothing)"
-        s.log(f"{u.name}: crafted {produced}")
+        self._turn_events.append(f"{u.name}: crafted {r._produced_text}")
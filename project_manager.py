@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import Optional
+from typing import Optional, Tuple
 from model import GameState, Project, Goal, Task
 from commands import Command, CommandBus
 
@@ -8,26 +8,26 @@ class ProjectManager:
     def __init__(self, state: GameState):
         self.state = state
 
+    def _find_task_path(self, project_id: str, goal_id: str,
+                        task_id: str) -> Optional[Tuple[Project, Goal, Task]]:
+        s = self.state
+        t = s._task_index.get((project_id, goal_id, task_id))
+        if t is None:
+            return None
+        return s._project_index[project_id], s._goal_index[(project_id, goal_id)], t
+
     def find_task(self, project_id: str, goal_id: str, task_id: str) -> Optional[Task]:
-        for p in self.state.projects:
-            if p.id != project_id:
-                continue
-            for g in p.goals:
-                if g.id != goal_id:
-                    continue
-                for t in g.tasks:
-                    if t.id == task_id:
-                        return t
-        return None
+        return self.state._task_index.get((project_id, goal_id, task_id))
 
     def toggle_task(self, project_id: str, goal_id: str, task_id: str) -> None:
-        t = self.find_task(project_id, goal_id, task_id)
-        if not t:
-            self.state.log(f"Task not found: {project_id}/{goal_id}/{task_id}")
+        path = self._find_task_path(project_id, goal_id, task_id)
+        if not path:
+            self.state.log("Task not found: %s/%s/%s", project_id, goal_id, task_id)
             return
+        p, g, t = path
         t.completed = not t.completed
-        self.state.recompute_project_status()
-        self.state.log(f"Task {'completed' if t.completed else 'reopened'}: {t.name}")
+        self.state.apply_task_toggle(p, g, t)
+        self.state.log("Task %s: %s", "completed" if t.completed else "reopened", t.name)
 
 
 def install_project_manager_handlers(bus: CommandBus, pm: ProjectManager) -> None:
@@ -1,40 +1,41 @@
 from __future__ import annotations
-import json
+import sys
 from typing import List
+from json_io import load_json
 from model import Project, Goal, Task, GameState
 
+_intern = sys.intern
+
 
 def load_tasks(path: str) -> List[Project]:
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = load_json(path)
 
     projects: List[Project] = []
     for p in data.get("projects", []):
+        pid = _intern(p["id"])
         proj = Project(
-            id=p["id"],
-            name=p.get("name", p["id"]),
-            required=bool(p.get("required", True)),
-            goals=[]
+            pid,
+            p.get("name") or pid,
+            bool(p.get("required", True)),
+            [
+                Goal(
+                    _intern(g["id"]),
+                    g.get("name") or g["id"],
+                    bool(g.get("required", True)),
+                    [
+                        Task(
+                            _intern(t["id"]),
+                            t.get("name") or t["id"],
+                            bool(t.get("required", True)),
+                            bool(t.get("completed", False))
+                        )
+                        for t in g.get("tasks", [])
+                    ]
+                )
+                for g in p.get("goals", [])
+            ]
         )
 
-        for g in p.get("goals", []):
-            goal = Goal(
-                id=g["id"],
-                name=g.get("name", g["id"]),
-                required=bool(g.get("required", True)),
-                tasks=[]
-            )
-
-            for t in g.get("tasks", []):
-                goal.tasks.append(Task(
-                    id=t["id"],
-                    name=t.get("name", t["id"]),
-                    required=bool(t.get("required", True)),
-                    completed=bool(t.get("completed", False))
-                ))
-
-            proj.goals.append(goal)
-
         print(f"Loaded goals: '{proj.goals}'")
 
         projects.append(proj)
@@ -44,6 +45,7 @@ def load_tasks(path: str) -> List[Project]:
 
 def install_tasks_into_state(state: GameState, projects: List[Project]) -> None:
     state.projects = projects
+    state.index_projects()
     state.recompute_project_status()
     state.selected_pm_item = None
     state.log("Loaded projects/goals/tasks from tasks.json.")
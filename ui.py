@@ -1,13 +1,93 @@
 from __future__ import annotations
+from collections import OrderedDict, deque
 from dataclasses import dataclass
+from operator import itemgetter
+import os
+import time
 from typing import Optional, Tuple, List, Dict
 
+import numpy as np
 import pygame
 import pygame_gui
 from pygame_gui.elements import UIPanel, UIButton, UILabel, UITextEntryLine, UISelectionList, UITextBox
 
-from model import GameState, ProcessingUnit
+from model import GameState, ProcessingUnit, Recipe
 from commands import CommandBus, Command
+from json_io import load_json, dump_json
+
+# numba is optional; without it the numpy unit cull is used
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+LABEL_COLOR = (220, 220, 235)
+LABEL_CACHE_MAX = 512  # rendered unit-name surfaces kept (LRU)
+_DISC_KEY = (255, 0, 255)  # colorkey for pre-rendered unit markers
+CULL_PAD = 24  # px: a unit whose center is this far outside the map can still show its marker
+PICK_RADIUS = 22.0  # world units
+PICK_CELL = 64  # spatial hash cell size in world units; must be >= PICK_RADIUS
+FILTER_DEBOUNCE_S = 0.15  # asset search applies once typing pauses this long
+
+# throttled panel refresh: rate adapts so refreshes take at most UI_REFRESH_BUDGET of wall time
+UI_REFRESH_MIN_HZ = 1.0
+UI_REFRESH_MAX_HZ = 6.0
+UI_REFRESH_BUDGET = 0.2
+UI_STALL_S = 1.5  # a frame longer than this (window drag, breakpoint...) skips the refresh
+
+# present() updates only the redrawn rects unless they add up to at least this share of the screen
+DIRTY_FLIP_FRACTION = 0.5
+
+# unit markers
+UNIT_COLORS = {
+    "Drone": (140, 200, 255),
+    "ResourcePile": (180, 230, 160),
+    "Factory": (230, 180, 120),
+}
+UNIT_COLOR_DEFAULT = (200, 200, 210)
+UNIT_R = 10
+UNIT_R_SELECTED = 14
+LABEL_MIN_ZOOM = 0.8  # below this, names overlap into a smear; only the selected unit keeps its label
+SELECT_RING_COLOR = (240, 240, 255)
+
+
+def _cull_units_np(pos, cam_x, cam_y, zoom, org_x, org_y, left, top, right, bottom):
+    """
+    World (N, 2) positions -> (visible row indexes, their float screen positions,
+    the same truncated to int) for units whose int screen point is inside
+    [left, right) x [top, bottom).
+    """
+    scr = (pos - (cam_x, cam_y)) * zoom + (org_x, org_y)
+    ixy = scr.astype(np.int64)  # truncates like int()
+    visible = np.flatnonzero((ixy[:, 0] >= left) & (ixy[:, 0] < right)
+                             & (ixy[:, 1] >= top) & (ixy[:, 1] < bottom))
+    return visible, scr[visible], ixy[visible]
+
+
+if njit is not None:
+    # same contract (and the same float64 operation order, so no fastmath) in one pass
+    @njit(cache=True, nogil=True)
+    def _cull_units(pos, cam_x, cam_y, zoom, org_x, org_y, left, top, right, bottom):
+        n = pos.shape[0]
+        visible = np.empty(n, dtype=np.int64)
+        scr = np.empty((n, 2), dtype=np.float64)
+        ixy = np.empty((n, 2), dtype=np.int64)
+        k = 0
+        for i in range(n):
+            sx = (pos[i, 0] - cam_x) * zoom + org_x
+            sy = (pos[i, 1] - cam_y) * zoom + org_y
+            x = np.int64(sx)
+            y = np.int64(sy)
+            if left <= x < right and top <= y < bottom:
+                visible[k] = i
+                scr[k, 0] = sx
+                scr[k, 1] = sy
+                ixy[k, 0] = x
+                ixy[k, 1] = y
+                k += 1
+        return visible[:k], scr[:k], ixy[:k]
+else:
+    _cull_units = _cull_units_np
 
 
 @dataclass
@@ -63,7 +143,8 @@ class Layout:
 
 class UI:
     def __init__(self, screen: pygame.Surface, manager: pygame_gui.UIManager, layout: Layout,
-                 state: GameState, bus: CommandBus, resources, map_state):
+                 state: GameState, bus: CommandBus, resources, map_state,
+                 ui_state_path: Optional[str] = None):
         self.screen = screen
         self.manager = manager
         self.layout = layout
@@ -72,7 +153,10 @@ class UI:
         self.resources = resources
 
         self.map_state = map_state
-        self.map_state.map_image = pygame.image.load(self.map_state.map_def.image_path).convert()
+        # match the display format once; keep per-pixel alpha only when the image has it
+        map_image = pygame.image.load(self.map_state.map_def.image_path)
+        has_alpha = map_image.get_flags() & pygame.SRCALPHA
+        self.map_state.map_image = map_image.convert_alpha() if has_alpha else map_image.convert()
 
         # ---- menu bar ----
         self.menu_panel = UIPanel(relative_rect=self.layout.rect_menu(), manager=self.manager)
@@ -95,7 +179,12 @@ class UI:
 
         # ---- assets tree state ----
         self._expanded_units = set()           # unit_ids currently expanded
-        self._asset_row_map = {}               # display_string -> metadata dict
+        self._asset_row_meta: List[dict] = []  # metadata per asset_list row, by position
+        self._assets_order: List[Tuple[str, ProcessingUnit]] = []  # (lowercased name, unit), sorted by name
+        self._assets_order_version = -1        # state.units_version the order was built for
+        self._id_lower: Dict[str, str] = {}    # resource id -> id.lower(), filled on first sight
+        self._asset_rows: Optional[List[str]] = None  # rows last given to asset_list
+        self._assets_sig = None  # inputs refresh_assets last built from
 
         # ---- right: inspector ----
         self.right_panel = UIPanel(self.layout.rect_right_top(), manager=self.manager)
@@ -136,7 +225,28 @@ class UI:
 
         self._pm_expanded_projects = set()
         self._pm_expanded_goals = set()
-        self._pm_row_map = {}
+        self._pm_row_meta: List[dict] = []  # metadata per pm_list row, by position
+        self._pm_rows: Optional[List[str]] = None  # rows last given to pm_list
+        self._pm_sig = None  # inputs refresh_projects last built from
+        self._pm_flat: list = []  # see _pm_flat_rows
+        self._pm_flat_version = -1
+
+        # event type -> handler; process_event does one dict lookup per event
+        self._event_handlers = {
+            pygame.MOUSEBUTTONDOWN: self._on_mouse_down,
+            pygame.MOUSEBUTTONUP: self._on_mouse_up,
+            pygame.MOUSEWHEEL: self._on_mouse_wheel,
+            pygame.MOUSEMOTION: self._on_mouse_motion,
+            pygame_gui.UI_BUTTON_PRESSED: self._on_button,
+            pygame_gui.UI_TEXT_ENTRY_FINISHED: self._on_text_finished,
+            pygame_gui.UI_TEXT_ENTRY_CHANGED: self._on_text_changed,
+            pygame_gui.UI_SELECTION_LIST_NEW_SELECTION: self._on_list_select,
+            pygame_gui.UI_SELECTION_LIST_DOUBLE_CLICKED_SELECTION: self._on_list_double_click,
+        }
+
+        # expanded rows persist across sessions (see save_ui_state)
+        self.ui_state_path = ui_state_path
+        self._load_ui_state()
         self._last_pm_filter = ""
 
 
@@ -147,17 +257,112 @@ class UI:
         self._panning = False
         self._pan_anchor_mouse = pygame.Vector2(0, 0)
         self._pan_anchor_cam = pygame.Vector2(0, 0)
+        self._font = pygame.font.Font(None, 20)  # loading a font is slow; once, not per frame
+        self._hud_key = None  # (zoom, cam x, cam y) that _hud_text was formatted for
+        self._hud_surf: Optional[pygame.Surface] = None  # _hud_text rendered
+        self._map_bg: Optional[pygame.Surface] = None  # panel fill + scaled bitmap for the current view
+        self._map_bg_key = None
+        self._bg_scaled: Optional[pygame.Surface] = None  # map_image smoothscaled to the current zoom
+        self._hud_text = ""
+        self._label_cache: OrderedDict[str, pygame.Surface] = OrderedDict()  # unit name -> rendered label
+        self._disc_cache: Dict[Tuple[Tuple[int, int, int], int, int], pygame.Surface] = {}
+        # unit draw order + (N, 2) world positions, rebuilt when state.units_version changes
+        # (units never move after load; a moving unit would need to bump the version)
+        self._units_version = -1
+        self._unit_list: List[ProcessingUnit] = []
+        self._unit_pos = np.zeros((0, 2), dtype=np.float64)
+        self._unit_xy: List[List[float]] = []
+        self._unit_grid: Dict[Tuple[int, int], List[int]] = {}  # PICK_CELL cell -> indexes into _unit_list
 
         # throttled UI refresh
         self._ui_accum = 0.0
-        self._ui_refresh_hz = 6.0  # refresh UI about 6 times/second
+        self._ui_refresh_hz = UI_REFRESH_MAX_HZ  # adapted by update() from measured refresh cost
+        self._ui_refresh_costs = deque(maxlen=30)  # seconds per recent refresh
         self._last_asset_filter = ""
+        self._asset_filter_due: Optional[float] = None  # time.monotonic() deadline of a pending search
+        # what each panel last showed; its refresh_* is skipped while this is unchanged
+        self._status_key = None
+        self._inspector_key = None
+        self._inspector_html = None
+        self._recipe_html_cache: Dict[Recipe, str] = {}
+        self._log_version = -1
+
+        # screen regions redrawn since the last present(); the first frame shows everything
+        self._dirty_rects: List[pygame.Rect] = [self.screen.get_rect()]
+        self._screen_area = self.screen.get_width() * self.screen.get_height()
 
         # initial populate
         self.refresh_all()
 
+    def _load_ui_state(self) -> None:
+        if not self.ui_state_path or not os.path.exists(self.ui_state_path):
+            return
+        try:
+            data = load_json(self.ui_state_path)
+            self._expanded_units = set(data.get("expanded_units", []))
+            self._pm_expanded_projects = set(data.get("expanded_projects", []))
+            self._pm_expanded_goals = set(data.get("expanded_goals", []))
+        except Exception as e:
+            # purely cosmetic state: start collapsed rather than fail
+            self.state.log("Ignoring unreadable UI state %s: %s", self.ui_state_path, e)
+
+    def save_ui_state(self) -> None:
+        """Write the expanded tree rows, dropping ids that no longer exist."""
+        if not self.ui_state_path:
+            return
+        s = self.state
+        payload = {
+            "expanded_units": sorted(uid for uid in self._expanded_units if uid in s.units),
+            "expanded_projects": sorted(pid for pid in self._pm_expanded_projects
+                                        if pid in s._project_index),
+            "expanded_goals": sorted(key for key in self._pm_expanded_goals
+                                     if tuple(key.split("/", 1)) in s._goal_index),
+        }
+        try:
+            dump_json(self.ui_state_path, payload)
+        except OSError as e:
+            s.log("Could not save UI state: %s", e)
+
+    @staticmethod
+    def _row_meta(sel_list: UISelectionList, metas: List[dict], row_text: str) -> Optional[dict]:
+        """
+        Metadata for the row an event refers to. Events only carry the row text, and
+        texts can repeat (e.g. the same "• wood: 10" under two units), so prefer the
+        selected row with that text and fall back to the first one.
+        """
+        first = None
+        for i, item in enumerate(sel_list.item_list):
+            if item["text"] == row_text:
+                if item.get("selected"):
+                    first = i
+                    break
+                if first is None:
+                    first = i
+        return metas[first] if first is not None and first < len(metas) else None
+
+    @staticmethod
+    def _set_list_rows(sel_list: UISelectionList, old_rows: Optional[List[str]], old_metas: List[dict],
+                       rows: List[str], metas: List[dict]) -> None:
+        """
+        Show `rows` in `sel_list`. set_item_list throws away every row button, the
+        scroll position and the selection, so it is used only when rows were added,
+        removed or reordered. When just row texts changed, e.g. inventory counts
+        ticking, the changed items and their buttons are relabelled in place.
+        """
+        if old_rows is None or metas != old_metas:
+            sel_list.set_item_list(rows)
+            return
+        items = sel_list.item_list
+        for i, (old, new) in enumerate(zip(old_rows, rows)):
+            if old == new:
+                continue
+            items[i]["text"] = new
+            button = items[i].get("button_element")
+            if button is not None:
+                button.set_text(new)
+
     def _handle_assets_click(self, row_text: str) -> None:
-        meta = self._asset_row_map.get(row_text)
+        meta = self._row_meta(self.asset_list, self._asset_row_meta, row_text)
         if not meta:
             return
 
@@ -181,8 +386,18 @@ class UI:
             # Example future: selecting resource could filter tasks/recipes
             return
 
+    def _handle_assets_double_click(self, row_text: str) -> None:
+        meta = self._row_meta(self.asset_list, self._asset_row_meta, row_text)
+        if meta and meta["type"] == "unit":
+            unit_id = meta["unit_id"]
+            if unit_id in self._expanded_units:
+                self._expanded_units.remove(unit_id)
+            else:
+                self._expanded_units.add(unit_id)
+            self.refresh_assets()
+
     def _handle_pm_click(self, row_text: str) -> None:
-        meta = self._pm_row_map.get(row_text)
+        meta = self._row_meta(self.pm_list, self._pm_row_meta, row_text)
         if not meta:
             return
 
@@ -200,7 +415,7 @@ class UI:
             self.refresh_projects()
 
     def _handle_pm_double_click(self, row_text: str) -> None:
-        meta = self._pm_row_map.get(row_text)
+        meta = self._row_meta(self.pm_list, self._pm_row_meta, row_text)
         if not meta:
             return
 
@@ -222,30 +437,20 @@ class UI:
 
     # ---------- rendering ----------
     def draw_map(self) -> None:
-        # panel background
-        pygame.draw.rect(self.screen, (8, 8, 10), self.map_rect)
-        pygame.draw.rect(self.screen, (40, 40, 50), self.map_rect, 1)
-
         m = self.map_state.map_def
-        img = self.map_state.map_image
 
-        # world -> screen
-        def world_to_screen(p: pygame.Vector2) -> pygame.Vector2:
-            local = (p - self._camera) * self._zoom
-            return pygame.Vector2(self.map_rect.topleft) + local
+        # world -> screen is (w - camera) * zoom + map origin, done on plain floats
+        cam_x, cam_y = self._camera.x, self._camera.y
+        zoom = self._zoom
+        org_x, org_y = self.map_rect.topleft
 
-        # ----- draw bitmap background -----
-        world_w, world_h = m.world_size  # in world units
-        map_top_left_screen = world_to_screen(pygame.Vector2(0, 0))
-
-        # Scale bitmap to match world size * zoom
-        # Assumption: bitmap represents entire map area.
-        scaled_w = max(1, int(world_w * self._zoom))
-        scaled_h = max(1, int(world_h * self._zoom))
-
-        # Scaling each frame is OK to start; later we can cache by zoom step
-        bg_scaled = pygame.transform.smoothscale(img, (scaled_w, scaled_h))
-        self.screen.blit(bg_scaled, (map_top_left_screen.x, map_top_left_screen.y))
+        # ----- panel background + bitmap -----
+        # composed into one viewport-sized surface, redone only when the view moves
+        bg_key = (self._zoom, self._camera.x, self._camera.y, self.map_rect.size)
+        if bg_key != self._map_bg_key:
+            self._map_bg_key = bg_key
+            self._compose_map_bg(pygame.Vector2(org_x - cam_x * zoom, org_y - cam_y * zoom))
+        self.screen.blit(self._map_bg, self.map_rect.topleft)
 
         # ----- fog of war overlay (draw only visible tiles) -----
         tile = m.tile_world_size
@@ -261,139 +466,216 @@ class UI:
         tx1 = min(m.width - 1, int(world_br.x // tile) + 1)
         ty1 = min(m.height - 1, int(world_br.y // tile) + 1)
 
-        fog_color = (0, 0, 0)
-
-        for ty in range(ty0, ty1 + 1):
-            for tx in range(tx0, tx1 + 1):
-                if self.map_state.is_explored(tx, ty):
-                    continue
-
-                # tile rect in world coords
-                wx = tx * tile
-                wy = ty * tile
-                # convert to screen rect
-                screen_pos = world_to_screen(pygame.Vector2(wx, wy))
-                rect = pygame.Rect(
-                    int(screen_pos.x),
-                    int(screen_pos.y),
-                    max(1, int(tile * self._zoom)),
-                    max(1, int(tile * self._zoom))
-                )
-                # Clip to map panel so fog doesn't spill
-                if rect.colliderect(self.map_rect):
-                    pygame.draw.rect(self.screen, fog_color, rect)
+        # one multiply-blit of the visible tile window instead of a rect per hidden tile
+        if tx1 >= tx0 and ty1 >= ty0:
+            fog = self.map_state.build_fog_surface()
+            window = fog.subsurface(pygame.Rect(tx0, ty0, tx1 - tx0 + 1, ty1 - ty0 + 1))
+            # both edges truncated the same way, so the window's far edge lands on its tile boundary
+            x0 = int((tx0 * tile - cam_x) * zoom + org_x)
+            y0 = int((ty0 * tile - cam_y) * zoom + org_y)
+            x1 = int(((tx1 + 1) * tile - cam_x) * zoom + org_x)
+            y1 = int(((ty1 + 1) * tile - cam_y) * zoom + org_y)
+            size = (max(1, x1 - x0), max(1, y1 - y0))
+
+            prev_clip = self.screen.get_clip()
+            self.screen.set_clip(self.map_rect)  # so fog doesn't spill outside the map panel
+            self.screen.blit(pygame.transform.scale(window, size), (x0, y0),
+                             special_flags=pygame.BLEND_MULT)
+            self.screen.set_clip(prev_clip)
 
         # ----- draw units on top -----
-        font = pygame.font.Font(None, 20)
+        font = self._font
         selected_id = self.state.selected_unit_id
-
-        for u in self.state.units.values():
-            wp = pygame.Vector2(u.pos)
-            sp = world_to_screen(wp)
-            if not self.map_rect.collidepoint(int(sp.x), int(sp.y)):
-                continue
-
+        blits = []  # markers + labels in draw order, issued as one fblits call
+
+        # transform + cull every unit at once; same float64 math as above.
+        # The viewport is grown by the marker size, so units straddling the edge are drawn (clipped)
+        self._sync_units()
+        mr = self.map_rect
+        visible, scr, ixy = _cull_units(self._unit_pos, cam_x, cam_y, float(zoom),
+                                        float(org_x), float(org_y),
+                                        mr.left - CULL_PAD, mr.top - CULL_PAD,
+                                        mr.right + CULL_PAD, mr.bottom + CULL_PAD)
+        units = self._unit_list
+        show_labels = self._zoom >= LABEL_MIN_ZOOM
+
+        for i, (sx, sy), (x, y) in zip(visible.tolist(), scr.tolist(), ixy.tolist()):
+            u = units[i]
             is_sel = (u.id == selected_id)
-            if u.kind == "Drone":
-                color = (140, 200, 255)
-            elif u.kind == "ResourcePile":
-                color = (180, 230, 160)
-            elif u.kind == "Factory":
-                color = (230, 180, 120)
-            else:
-                color = (200, 200, 210)
+            color = UNIT_COLORS.get(u.kind, UNIT_COLOR_DEFAULT)
 
-            r = 10 if not is_sel else 14
-            pygame.draw.circle(self.screen, color, (int(sp.x), int(sp.y)), r)
+            r = UNIT_R_SELECTED if is_sel else UNIT_R
+            blits.append((self._disc(color, r), (x - r - 1, y - r - 1)))
             if is_sel:
-                pygame.draw.circle(self.screen, (240, 240, 255), (int(sp.x), int(sp.y)), r + 3, 2)
-
-            label = font.render(u.name, True, (220, 220, 235))
-            self.screen.blit(label, (sp.x + r + 6, sp.y - 10))
+                blits.append((self._disc(SELECT_RING_COLOR, r + 3, 2), (x - r - 4, y - r - 4)))
+
+            if show_labels or is_sel:
+                blits.append((self._label(u.name), (sx + r + 6, sy - 10)))
+
+        if blits:
+            prev_clip = self.screen.get_clip()
+            self.screen.set_clip(self.map_rect)
+            self.screen.fblits(blits)
+            self.screen.set_clip(prev_clip)
+
+        hud_key = (self._zoom, int(self._camera.x), int(self._camera.y))
+        if hud_key != self._hud_key:
+            self._hud_key = hud_key
+            text = f"Zoom: {hud_key[0]:.2f}  |  Cam: {hud_key[1]}, {hud_key[2]}"
+            if text != self._hud_text:
+                self._hud_text = text
+                self._hud_surf = font.render(text, True, (200, 200, 215))
+        self.screen.blit(self._hud_surf, (self.map_rect.left + 10, self.map_rect.top + 10))
+        self._dirty_rects.append(self.map_rect)
+
+
+    def _compose_map_bg(self, map_top_left_screen: pygame.Vector2) -> None:
+        rect = self.map_rect
+        if self._map_bg is None or self._map_bg.get_size() != rect.size:
+            self._map_bg = pygame.Surface(rect.size).convert()
+        bg = self._map_bg
+        local = pygame.Rect((0, 0), rect.size)
 
-        hud = font.render(f"Zoom: {self._zoom:.2f}  |  Cam: {int(self._camera.x)}, {int(self._camera.y)}", True, (200, 200, 215))
-        self.screen.blit(hud, (self.map_rect.left + 10, self.map_rect.top + 10))
+        # panel background
+        bg.fill((8, 8, 10))
+        pygame.draw.rect(bg, (40, 40, 50), local, 1)
 
+        # Scale bitmap to match world size * zoom
+        # Assumption: bitmap represents entire map area.
+        world_w, world_h = self.map_state.map_def.world_size  # in world units
+        scaled_w = max(1, int(world_w * self._zoom))
+        scaled_h = max(1, int(world_h * self._zoom))
+        # the full-image resample is the expensive part; pans reuse it, only zoom redoes it
+        if self._bg_scaled is None or self._bg_scaled.get_size() != (scaled_w, scaled_h):
+            # smoothscale keeps map_image's (already display-converted) format
+            self._bg_scaled = pygame.transform.smoothscale(self.map_state.map_image, (scaled_w, scaled_h))
+        bg_scaled = self._bg_scaled
+        # truncate in screen space first, as a direct screen blit would
+        bg.blit(bg_scaled, (int(map_top_left_screen.x) - rect.left, int(map_top_left_screen.y) - rect.top))
+
+    def _sync_units(self) -> None:
+        if self._units_version == self.state.units_version:
+            return
+        self._unit_list = list(self.state.units.values())
+        self._unit_pos = np.array([u.pos for u in self._unit_list], dtype=np.float64).reshape(-1, 2)
+        self._unit_xy = self._unit_pos.tolist()  # plain floats for scalar use
+        grid: Dict[Tuple[int, int], List[int]] = {}
+        for i, (ux, uy) in enumerate(self._unit_xy):
+            grid.setdefault((int(ux // PICK_CELL), int(uy // PICK_CELL)), []).append(i)
+        self._unit_grid = grid
+        self._units_version = self.state.units_version
+
+    def _disc(self, color: Tuple[int, int, int], r: int, width: int = 0) -> pygame.Surface:
+        # same pixels as pygame.draw.circle(.., center, r, width) when blitted at center - (r + 1)
+        key = (color, r, width)
+        surf = self._disc_cache.get(key)
+        if surf is None:
+            size = 2 * r + 3
+            surf = pygame.Surface((size, size))
+            surf.fill(_DISC_KEY)
+            surf.set_colorkey(_DISC_KEY)
+            pygame.draw.circle(surf, color, (r + 1, r + 1), r, width)
+            self._disc_cache[key] = surf = surf.convert()
+        return surf
+
+    def _label(self, name: str) -> pygame.Surface:
+        # keyed by the text itself, so a renamed unit just misses and re-renders
+        cache = self._label_cache
+        surf = cache.get(name)
+        if surf is None:
+            surf = cache[name] = self._font.render(name, True, LABEL_COLOR)
+            if len(cache) > LABEL_CACHE_MAX:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(name)
+        return surf
 
     # ---------- input handling ----------
     def process_event(self, event: pygame.event.Event) -> None:
         # Let pygame_gui consume it first
         self.manager.process_events(event)
 
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if event.button == 2 and self.map_rect.collidepoint(event.pos):
-                # middle mouse pan
-                self._panning = True
-                self._pan_anchor_mouse = pygame.Vector2(event.pos)
-                self._pan_anchor_cam = self._camera.copy()
-
-            elif event.button == 1 and self.map_rect.collidepoint(event.pos):
-                # left click: select nearest factory
-                unit = self.pick_unit_at_screen(event.pos)
-                if unit:
-                    self.bus.dispatch(Command("select_unit", {"unit_id": unit.id}))
-                else:
-                    self.bus.dispatch(Command("select_unit", {"unit_id": None}))
-
-            elif event.button in (4, 5) and self.map_rect.collidepoint(event.pos):
-                # mouse wheel up/down (some systems)
-                self._apply_zoom(1.10 if event.button == 4 else 0.90, pivot=event.pos)
-
-        elif event.type == pygame.MOUSEBUTTONUP:
-            if event.button == 2:
-                self._panning = False
-
-        elif event.type == pygame.MOUSEWHEEL:
-            # pygame 2.0+ wheel event
-            if self.map_rect.collidepoint(pygame.mouse.get_pos()):
-                factor = 1.10 if event.y > 0 else 0.90
-                self._apply_zoom(factor, pivot=pygame.mouse.get_pos())
-
-        elif event.type == pygame.MOUSEMOTION:
-            if self._panning:
-                cur = pygame.Vector2(event.pos)
-                delta = (cur - self._pan_anchor_mouse) / max(self._zoom, 0.001)
-                self._camera = self._pan_anchor_cam - delta
-
-        elif event.type == pygame_gui.UI_BUTTON_PRESSED:
-            if event.ui_element == self.btn_pause:
-                self.bus.dispatch(Command("pause", {}))
-            elif event.ui_element == self.btn_resume:
-                self.bus.dispatch(Command("resume", {}))
-            elif event.ui_element == self.btn_focus:
-                self.bus.dispatch(Command("focus_selected", {}))
-
-        elif event.type == pygame_gui.UI_TEXT_ENTRY_FINISHED:
-            if event.ui_element == self.asset_search:
-                self.refresh_assets()
-
-        elif event.type == pygame_gui.UI_SELECTION_LIST_NEW_SELECTION:
-            if event.ui_element == self.asset_list:
-                self._handle_assets_click(event.text)
-
-        elif event.type == pygame_gui.UI_SELECTION_LIST_DOUBLE_CLICKED_SELECTION:
-            if event.ui_element == self.asset_list:
-                meta = self._asset_row_map.get(event.text)
-                if meta and meta["type"] == "unit":
-                    unit_id = meta["unit_id"]
-                    if unit_id in self._expanded_units:
-                        self._expanded_units.remove(unit_id)
-                    else:
-                        self._expanded_units.add(unit_id)
-                    self.refresh_assets()
-
-        elif event.type == pygame_gui.UI_SELECTION_LIST_NEW_SELECTION:
-            if event.ui_element == self.pm_list:
-                self._handle_pm_click(event.text)
+        handler = self._event_handlers.get(event.type)
+        if handler:
+            handler(event)
+
+        # hover, focus and typing can restyle any widget
+        self._dirty_rects.append(self.screen.get_rect())
+
+    def present(self) -> None:
+        """Show the frame: update just the redrawn regions, or flip when they cover most of the screen."""
+        rects = self._dirty_rects
+        if sum(r.w * r.h for r in rects) < self._screen_area * DIRTY_FLIP_FRACTION:
+            pygame.display.update(rects)
+        else:
+            pygame.display.flip()
+        rects.clear()
+
+    def _on_mouse_down(self, event: pygame.event.Event) -> None:
+        if event.button == 2 and self.map_rect.collidepoint(event.pos):
+            # middle mouse pan
+            self._panning = True
+            self._pan_anchor_mouse = pygame.Vector2(event.pos)
+            self._pan_anchor_cam = self._camera.copy()
+
+        elif event.button == 1 and self.map_rect.collidepoint(event.pos):
+            # left click: select nearest factory
+            unit = self.pick_unit_at_screen(event.pos)
+            if unit:
+                self.bus.dispatch(Command("select_unit", {"unit_id": unit.id}))
+            else:
+                self.bus.dispatch(Command("select_unit", {"unit_id": None}))
+
+        elif event.button in (4, 5) and self.map_rect.collidepoint(event.pos):
+            # mouse wheel up/down (some systems)
+            self._apply_zoom(1.10 if event.button == 4 else 0.90, pivot=event.pos)
+
+    def _on_mouse_up(self, event: pygame.event.Event) -> None:
+        if event.button == 2:
+            self._panning = False
+
+    def _on_mouse_wheel(self, event: pygame.event.Event) -> None:
+        # pygame 2.0+ wheel event
+        if self.map_rect.collidepoint(pygame.mouse.get_pos()):
+            factor = 1.10 if event.y > 0 else 0.90
+            self._apply_zoom(factor, pivot=pygame.mouse.get_pos())
+
+    def _on_mouse_motion(self, event: pygame.event.Event) -> None:
+        if self._panning:
+            zoom = max(self._zoom, 0.001)
+            self._camera.update(self._pan_anchor_cam.x - (event.pos[0] - self._pan_anchor_mouse.x) / zoom,
+                                self._pan_anchor_cam.y - (event.pos[1] - self._pan_anchor_mouse.y) / zoom)
+
+    def _on_button(self, event: pygame.event.Event) -> None:
+        if event.ui_element == self.btn_pause:
+            self.bus.dispatch(Command("pause", {}))
+        elif event.ui_element == self.btn_resume:
+            self.bus.dispatch(Command("resume", {}))
+        elif event.ui_element == self.btn_focus:
+            self.bus.dispatch(Command("focus_selected", {}))
+
+    def _on_text_finished(self, event: pygame.event.Event) -> None:
+        if event.ui_element == self.asset_search:
+            self.refresh_assets()
+        elif event.ui_element == self.pm_search:
+            self.refresh_projects()
 
-        elif event.type == pygame_gui.UI_SELECTION_LIST_DOUBLE_CLICKED_SELECTION:
-            if event.ui_element == self.pm_list:
-                self._handle_pm_double_click(event.text)
+    def _on_text_changed(self, event: pygame.event.Event) -> None:
+        if event.ui_element == self.asset_search:
+            # (re)start the debounce; update() applies the filter when it expires
+            self._asset_filter_due = time.monotonic() + FILTER_DEBOUNCE_S
 
-        elif event.type == pygame_gui.UI_TEXT_ENTRY_FINISHED:
-            if event.ui_element == self.pm_search:
-                self.refresh_projects()
+    def _on_list_select(self, event: pygame.event.Event) -> None:
+        if event.ui_element == self.asset_list:
+            self._handle_assets_click(event.text)
+        elif event.ui_element == self.pm_list:
+            self._handle_pm_click(event.text)
 
+    def _on_list_double_click(self, event: pygame.event.Event) -> None:
+        if event.ui_element == self.asset_list:
+            self._handle_assets_double_click(event.text)
+        elif event.ui_element == self.pm_list:
+            self._handle_pm_double_click(event.text)
 
     def _apply_zoom(self, factor: float, pivot: Tuple[int, int]) -> None:
         # zoom around a pivot point so it feels anchored
@@ -402,51 +684,88 @@ class UI:
         if abs(new_zoom - old_zoom) < 1e-6:
             return
 
-        pivot = pygame.Vector2(pivot)
-        pivot_local = pivot - pygame.Vector2(self.map_rect.topleft)
+        lx = pivot[0] - self.map_rect.left
+        ly = pivot[1] - self.map_rect.top
 
         # world point under cursor before zoom:
-        world_before = self._camera + (pivot_local / old_zoom)
+        wx = self._camera.x + lx / old_zoom
+        wy = self._camera.y + ly / old_zoom
         # update zoom:
         self._zoom = new_zoom
         # world point under cursor after zoom should remain the same:
-        self._camera = world_before - (pivot_local / new_zoom)
+        self._camera.update(wx - lx / new_zoom, wy - ly / new_zoom)
 
     def pick_unit_at_screen(self, pos):
-        p = pygame.Vector2(pos)
-        local = p - pygame.Vector2(self.map_rect.topleft)
-        world = self._camera + (local / max(self._zoom, 0.001))
-
-        best = None
-        best_d2 = 999999.0
-        for u in self.state.units.values():
-            up = pygame.Vector2(u.pos)
-            d2 = (up - world).length_squared()
-            if d2 < best_d2:
-                best_d2 = d2
-                best = u
-
-        if best and best_d2 <= (22.0 ** 2):
-            return best
+        zoom = max(self._zoom, 0.001)
+        wx = self._camera.x + (pos[0] - self.map_rect.left) / zoom
+        wy = self._camera.y + (pos[1] - self.map_rect.top) / zoom
+
+        # only the 3x3 cells around the click can hold a unit within PICK_RADIUS
+        self._sync_units()
+        cx, cy = int(wx // PICK_CELL), int(wy // PICK_CELL)
+        grid = self._unit_grid
+        pts = self._unit_xy
+        best = None  # (d2, index): ties go to the earlier unit, as with a full scan
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                for i in grid.get((gx, gy), ()):
+                    ux, uy = pts[i]
+                    dx = ux - wx
+                    dy = uy - wy
+                    cand = (dx * dx + dy * dy, i)
+                    if best is None or cand < best:
+                        best = cand
+
+        if best and best[0] <= PICK_RADIUS ** 2:
+            return self._unit_list[best[1]]
         return None
 
     # ---------- UI refresh ----------
     def update(self, dt_s: float) -> None:
         self.manager.update(dt_s)
 
+        # a focused text entry has a blinking cursor; keep redrawing while typing
+        if self.asset_search.is_focused:
+            self.state.dirty = True
+            self._dirty_rects.append(self.layout.rect_left())
+        if self.pm_search.is_focused:
+            self.state.dirty = True
+            self._dirty_rects.append(self.layout.rect_bottom_right())
+
         # throttle expensive UI rebuilds
         self._ui_accum += dt_s
-        if self._ui_accum >= (1.0 / self._ui_refresh_hz):
+        interval = 1.0 / self._ui_refresh_hz
+        if not pygame.key.get_focused():
+            interval *= 2.0  # nobody is typing into or watching a background window closely
+        if dt_s > UI_STALL_S:
+            self._ui_accum = 0.0  # catching up after a stall; don't pile a refresh on top
+        elif self._ui_accum >= interval:
             self._ui_accum = 0.0
+            n_dirty = len(self._dirty_rects)
+            t0 = time.perf_counter()
             self.refresh_status()
             self.refresh_inspector()
             self.refresh_log()
-
-            # update assets if filter changed (live-ish search)
+            if self._asset_filter_due is None:  # don't apply a search mid-debounce
+                self.refresh_assets()  # no-op unless inventories, units or the tree changed
+            if len(self._dirty_rects) > n_dirty:
+                self.state.dirty = True  # only redraw when a panel actually changed
+            costs = self._ui_refresh_costs
+            costs.append(time.perf_counter() - t0)
+            avg = sum(costs) / len(costs)
+            self._ui_refresh_hz = max(UI_REFRESH_MIN_HZ,
+                                      min(UI_REFRESH_MAX_HZ, UI_REFRESH_BUDGET / max(avg, 1e-6)))
+
+        # live-ish search: once typing has paused, refresh assets if the filter really changed
+        if self._asset_filter_due is not None and time.monotonic() >= self._asset_filter_due:
+            self._asset_filter_due = None
             cur_filter = self.asset_search.get_text().strip().lower()
             if cur_filter != self._last_asset_filter:
                 self._last_asset_filter = cur_filter
+                n_dirty = len(self._dirty_rects)
                 self.refresh_assets()
+                if len(self._dirty_rects) > n_dirty:
+                    self.state.dirty = True
 
     def refresh_all(self) -> None:
         self.refresh_status()
@@ -456,29 +775,50 @@ class UI:
         self.refresh_projects() 
 
     def refresh_status(self) -> None:
+        s = self.state
+        key = (s.paused, s.sim_turn, s.selected_unit_id)
+        if key == self._status_key:
+            return
+        self._status_key = key
         paused = "PAUSED" if self.state.paused else "RUNNING"
         sel = self.state.get_selected_unit()
         sel_txt = sel.name if sel else "None"
         self.lbl_status.set_text(f"Sim: {paused}  |  Turn: {self.state.sim_turn}  |  Selected: {sel_txt}")
+        self._dirty_rects.append(self.layout.rect_menu())
 
     def refresh_assets(self) -> None:
         filt = self.asset_search.get_text().strip().lower()
+        s = self.state
+        sig = (s.units_version, s.assets_version, filt, frozenset(self._expanded_units))
+        if sig == self._assets_sig:
+            return
+        self._assets_sig = sig
 
         rows = []
-        self._asset_row_map = {}
+        old_metas = self._asset_row_meta
+        metas = self._asset_row_meta = []
+
+        # Sort units by name for stable display; re-sorted only when units are added/removed
+        if self._assets_order_version != self.state.units_version:
+            self._assets_order = sorted(((u.name.lower(), u) for u in self.state.units.values()),
+                                        key=itemgetter(0))
+            self._assets_order_version = self.state.units_version
+
+        id_lower = self._id_lower
 
-        # Sort units by name for stable display
-        units = sorted(self.state.units.values(), key=lambda u: u.name.lower())
+        def low(k: str) -> str:
+            id_lower[k] = k_lower = k.lower()
+            return k_lower
 
-        for u in units:
+        for name_lower, u in self._assets_order:
             # filter: if filter matches unit name OR any inventory item
-            unit_match = (not filt) or (filt in u.name.lower())
+            unit_match = (not filt) or (filt in name_lower)
 
-            inv_items = sorted(u.inventory.items(), key=lambda kv: kv[0].lower())
+            inv_items = sorted((id_lower.get(k) or low(k), k, v) for k, v in u.inventory.items())
             inv_match = False
             if filt and not unit_match:
-                for item, qty in inv_items:
-                    if filt in item.lower():
+                for item_lower, item, qty in inv_items:
+                    if filt in item_lower:
                         inv_match = True
                         break
 
@@ -490,34 +830,43 @@ class UI:
 
             unit_line = f"{tri}  {u.name}  ({u.kind})"
             rows.append(unit_line)
-            self._asset_row_map[unit_line] = {"type": "unit", "unit_id": u.id}
+            metas.append({"type": "unit", "unit_id": u.id})
 
             if expanded:
                 if inv_items:
-                    for item, qty in inv_items:
+                    for item_lower, item, qty in inv_items:
                         # resource child line
                         child = f"    • {item}: {qty}"
                         # apply filter to children too (if filter is active and didn't match unit name)
-                        if filt and (not unit_match) and (filt not in item.lower()):
+                        if filt and (not unit_match) and (filt not in item_lower):
                             continue
                         rows.append(child)
-                        self._asset_row_map[child] = {
+                        metas.append({
                             "type": "resource",
                             "unit_id": u.id,
                             "resource": item
-                        }
+                        })
                 else:
                     child = "    • (empty)"
                     rows.append(child)
-                    self._asset_row_map[child] = {"type": "resource", "unit_id": u.id, "resource": None}
+                    metas.append({"type": "resource", "unit_id": u.id, "resource": None})
 
-        self.asset_list.set_item_list(rows)
+        # set_item_list rebuilds every row widget; skip it when nothing would change
+        if rows != self._asset_rows:
+            self._set_list_rows(self.asset_list, self._asset_rows, old_metas, rows, metas)
+            self._asset_rows = rows
+            self._dirty_rects.append(self.layout.rect_left())
 
 
     def refresh_inspector(self) -> None:
-        u = self.state.get_selected_unit()
+        s = self.state
+        u = s.get_selected_unit()
+        key = (s.selected_unit_id, s.units_version, u.version if u else 0, u.status if u else None)
+        if key == self._inspector_key:
+            return
+        self._inspector_key = key
         if not u:
-            self.inspect_box.set_text("Select a unit on the map to inspect it.")
+            self._set_inspector_html("Select a unit on the map to inspect it.")
             return
 
         def fmt_inv(inv):
@@ -531,17 +880,7 @@ class UI:
             x = self.state.get_unit(unit_id)
             return x.name if x else unit_id
 
-        recipe_txt = "None"
-        if u.recipe:
-            r = u.recipe
-            parts = [f"<b>{r.name}</b>", f"Duration: {r.duration_turns} turn(s)"]
-            if r.transfer_resource:
-                parts.append(f"Transfer resource: {r.transfer_resource}")
-            if r.inputs:
-                parts.append("<br><b>Inputs</b><br>" + "<br>".join([f"{k}: {v}" for k, v in r.inputs.items()]))
-            if r.outputs:
-                parts.append("<br><b>Outputs</b><br>" + "<br>".join([f"{k}: {v}" for k, v in r.outputs.items()]))
-            recipe_txt = "<br>".join(parts)
+        recipe_txt = self._recipe_html(u.recipe) if u.recipe else "None"
 
         html = (
             f"<b>{u.name}</b><br>"
@@ -554,98 +893,124 @@ class UI:
             f"{recipe_txt}<br><br>"
             f"{('<i>' + u.notes + '</i>') if u.notes else ''}"
         )
-        self.inspect_box.set_text(html)
+        self._set_inspector_html(html)
+
+    def _recipe_html(self, r: Recipe) -> str:
+        # recipes are frozen, so their inspector section is built once per recipe
+        txt = self._recipe_html_cache.get(r)
+        if txt is None:
+            parts = [f"<b>{r.name}</b>", f"Duration: {r.duration_turns} turn(s)"]
+            if r.transfer_resource:
+                parts.append(f"Transfer resource: {r.transfer_resource}")
+            if r.inputs:
+                parts.append("<br><b>Inputs</b><br>" + "<br>".join([f"{k}: {v}" for k, v in r.inputs.items()]))
+            if r.outputs:
+                parts.append("<br><b>Outputs</b><br>" + "<br>".join([f"{k}: {v}" for k, v in r.outputs.items()]))
+            txt = self._recipe_html_cache[r] = "<br>".join(parts)
+        return txt
+
+    def _set_inspector_html(self, html: str) -> None:
+        # set_text re-parses and re-lays out the whole box
+        if html != self._inspector_html:
+            self._inspector_html = html
+            self.inspect_box.set_text(html)
+            self._dirty_rects.append(self.layout.rect_right_top())
 
 
     def refresh_log(self) -> None:
+        if self._log_version == self.state.events_version:
+            return
+        self._log_version = self.state.events_version
         # show last N lines
-        tail = self.state.events[-18:]
-        html = "<br>".join([line.replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;") for line in tail])
+        html = "<br>".join(self.state.recent_events(18, html=True))
         self.log_box.set_text(html)
+        self._dirty_rects.append(self.layout.rect_bottom_left())
+
+    def _pm_flat_rows(self) -> list:
+        """
+        The whole project tree as one pre-order list of
+        (kind, project, goal, task, goal_key, search_lc), each level sorted by
+        lowercased name. search_lc joins the lowercased names of the row's
+        ancestors, itself and its descendants, so "filter matches this row or
+        anything above/below it" is one substring test. Rebuilt only when
+        projects_version changes.
+        """
+        if self._pm_flat_version != self.state.projects_version:
+            def by_name(objs):
+                return sorted(((o.name.lower(), o) for o in objs), key=itemgetter(0))
+
+            flat = []
+            for p_lc, p in by_name(self.state.projects):
+                p_row = len(flat)
+                flat.append(None)  # filled once the descendants' names are known
+                p_names = [p_lc]
+                for g_lc, g in by_name(p.goals):
+                    goal_key = f"{p.id}/{g.id}"
+                    tasks = by_name(g.tasks)
+                    g_names = [g_lc, *(t_lc for t_lc, _ in tasks)]
+                    p_names += g_names
+                    flat.append(("goal", p, g, None, goal_key, "\0".join((p_lc, *g_names))))
+                    flat.extend(("task", p, g, t, goal_key, "\0".join((p_lc, g_lc, t_lc)))
+                                for t_lc, t in tasks)
+                flat[p_row] = ("project", p, None, None, None, "\0".join(p_names))
+
+            self._pm_flat = flat
+            self._pm_flat_version = self.state.projects_version
+        return self._pm_flat
 
     def refresh_projects(self) -> None:
         filt = self.pm_search.get_text().strip().lower()
+        sig = (self.state.projects_version, filt,
+               frozenset(self._pm_expanded_projects), frozenset(self._pm_expanded_goals))
+        if sig == self._pm_sig:
+            return
+        self._pm_sig = sig
 
-        rows = []
-        self._pm_row_map = {}
+        exp_p = self._pm_expanded_projects
+        exp_g = self._pm_expanded_goals
+        visible = [r for r in self._pm_flat_rows()
+                   if (r[0] == "project" or (r[1].id in exp_p and (r[0] == "goal" or r[4] in exp_g)))
+                   and (not filt or filt in r[5])]
 
         def checkbox(done: bool) -> str:
             return "☑" if done else "☐"
 
-        for p in sorted(self.state.projects, key=lambda x: x.name.lower()):
-            # filter match for project or any descendants
-            project_matches = (not filt) or (filt in p.name.lower())
-
-            # compute descendant match
-            descendant_matches = False
-            if filt and not project_matches:
-                for g in p.goals:
-                    if filt in g.name.lower():
-                        descendant_matches = True
-                        break
-                    for t in g.tasks:
-                        if filt in t.name.lower():
-                            descendant_matches = True
-                            break
-                    if descendant_matches:
-                        break
-
-            if filt and not (project_matches or descendant_matches):
-                continue
-
-            tri = "▼" if p.id in self._pm_expanded_projects else "▶"
-            req = "R" if p.required else "O"
-            line_p = f"{tri} {checkbox(p.completed)} [{req}] {p.name}"
-            rows.append(line_p)
-            self._pm_row_map[line_p] = {
-                "type": "project",
-                "project_id": p.id,
-                "key": f"project:{p.id}"
-            }
-
-            if p.id not in self._pm_expanded_projects:
-                continue
-
-            for g in sorted(p.goals, key=lambda x: x.name.lower()):
-                goal_key = f"{p.id}/{g.id}"
-                goal_matches = (not filt) or (filt in g.name.lower())
-                if filt and not (project_matches or goal_matches):
-                    # only show matching tasks under this goal
-                    pass
-
-                tri_g = "▼" if goal_key in self._pm_expanded_goals else "▶"
+        rows = []
+        old_metas = self._pm_row_meta
+        metas = self._pm_row_meta = []
+        for kind, p, g, t, goal_key, _ in visible:
+            if kind == "project":
+                tri = "▼" if p.id in exp_p else "▶"
+                req = "R" if p.required else "O"
+                rows.append(f"{tri} {checkbox(p.completed)} [{req}] {p.name}")
+                metas.append({
+                    "type": "project",
+                    "project_id": p.id,
+                    "key": f"project:{p.id}"
+                })
+            elif kind == "goal":
+                tri_g = "▼" if goal_key in exp_g else "▶"
                 req_g = "R" if g.required else "O"
-                line_g = f"    {tri_g} {checkbox(g.completed)} [{req_g}] {g.name}"
-                # show goal line if it matches filter, or any task matches filter
-                if filt and not (project_matches or goal_matches):
-                    any_task_match = any(filt in t.name.lower() for t in g.tasks)
-                    if not any_task_match:
-                        continue
-
-                rows.append(line_g)
-                self._pm_row_map[line_g] = {
+                rows.append(f"    {tri_g} {checkbox(g.completed)} [{req_g}] {g.name}")
+                metas.append({
                     "type": "goal",
                     "project_id": p.id,
                     "goal_id": g.id,
                     "goal_key": goal_key,
-                    "key": f"goal:{p.id}/{g.id}"
-                }
-
-                if goal_key not in self._pm_expanded_goals:
-                    continue
-
-                for t in sorted(g.tasks, key=lambda x: x.name.lower()):
-                    if filt and not (project_matches or goal_matches or (filt in t.name.lower())):
-                        continue
-                    req_t = "R" if t.required else "O"
-                    line_t = f"        {checkbox(t.completed)} [{req_t}] {t.name}"
-                    rows.append(line_t)
-                    self._pm_row_map[line_t] = {
-                        "type": "task",
-                        "project_id": p.id,
-                        "goal_id": g.id,
-                        "task_id": t.id,
-                        "key": f"task:{p.id}/{g.id}/{t.id}"
-                    }
-
-        self.pm_list.set_item_list(rows)
+                    "key": f"goal:{goal_key}"
+                })
+            else:
+                req_t = "R" if t.required else "O"
+                rows.append(f"        {checkbox(t.completed)} [{req_t}] {t.name}")
+                metas.append({
+                    "type": "task",
+                    "project_id": p.id,
+                    "goal_id": g.id,
+                    "task_id": t.id,
+                    "key": f"task:{goal_key}/{t.id}"
+                })
+
+        if rows != self._pm_rows:
+            self._set_list_rows(self.pm_list, self._pm_rows, old_metas, rows, metas)
+            self._pm_rows = rows
+            self._dirty_rects.append(self.layout.rect_bottom_right())